@@ -0,0 +1,51 @@
+"""
+Normalization of uploaded avatars.
+
+Whatever the user uploads, the stored avatar is an ``AVATAR_SIZE`` square
+WebP without metadata. The upload is spooled to a temporary file by
+``my_account_view`` and only its header is read before the checks, so an
+oversized or malicious image is rejected without being decoded. JPEGs are
+decoded straight at a reduced scale, which keeps memory low for large
+phone photos.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+
+def normalize_avatar(upload):
+    """Return ``upload`` as a small square WebP, or raise ValidationError."""
+    if upload.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            f'Please upload an image smaller than {filesizeformat(settings.AVATAR_MAX_UPLOAD_SIZE)}.')
+
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Please upload a valid image.')
+
+    # Decompression bombs: a small file that decodes to a huge bitmap
+    if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+        raise ValidationError('This image has too many pixels.')
+
+    size = settings.AVATAR_SIZE
+    try:
+        # JPEG only: decode at 1/2, 1/4 or 1/8 scale, still at least size x size
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError('Please upload a valid image.')
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    # Saved without the original's EXIF, ICC profile and other metadata
+    buffer = BytesIO()
+    image.save(buffer, 'WEBP', quality=85, method=6)
+    return ContentFile(buffer.getvalue(), name='avatar.webp')
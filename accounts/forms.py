@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth import authenticate
 from .models import Account
+from .avatars import normalize_avatar
 from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 
 class RegisterForm(forms.Form):
     username = forms.CharField(
@@ -114,6 +116,12 @@ class ProfileUpdateForm(forms.ModelForm):
         if self.instance:
             self.fields['full_name'].initial = f"{self.instance.first_name} {self.instance.last_name}".strip()
     
+    def clean_avatar(self):
+        avatar = self.cleaned_data.get('avatar')
+        if isinstance(avatar, UploadedFile):
+            return normalize_avatar(avatar)
+        return avatar
+    
     def save(self, commit=True):
         account = super().save(commit=False)
         full_name = self.cleaned_data.get('full_name', '')
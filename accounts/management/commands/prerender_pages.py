@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.prerender import PAGES, page_path, render_page
+
+
+class Command(BaseCommand):
+    help = 'Render the static content pages (about, FAQ, contact) to PRERENDERED_PAGES_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pages', nargs='*', help=f'Pages to render (default: all of {", ".join(PAGES)})')
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or list(PAGES)
+        unknown = [name for name in pages if name not in PAGES]
+        if unknown:
+            raise CommandError(f'Unknown page(s): {", ".join(unknown)}')
+
+        for name in pages:
+            content = render_page(name)
+            self.stdout.write(f'{name}: {len(content):,} bytes -> {page_path(name)}')
+        self.stdout.write(self.style.SUCCESS(f'Pre-rendered {len(pages)} page(s)'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:27
+
+import ecommerce.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='id',
+            field=models.UUIDField(default=ecommerce.ids.uuid7, editable=False, primary_key=True, serialize=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:44
+
+import ecommerce.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_uuid7_primary_keys'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='account',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=ecommerce.storage.ContentAddressedStorage(), upload_to='avatars/'),
+        ),
+    ]
@@ -1,12 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-import uuid
+from ecommerce.ids import uuid7
+from ecommerce.storage import upload_storage
 
 
 class Account(AbstractUser):
     """Custom user model extending Django's AbstractUser"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False, unique=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=upload_storage, blank=True, null=True)
     phone_number = models.CharField(max_length=255, null=True, blank=True)
     is_email_verified = models.BooleanField(default=False)
     otp = models.CharField(max_length=6, blank=True, null=True)
@@ -0,0 +1,69 @@
+"""
+Pre-rendered static content pages.
+
+The about, FAQ and contact pages are the same for every visitor, so they
+are rendered once per deploy and the bytes are written to
+``PRERENDERED_PAGES_DIR``. They show no catalog or per-visitor data, so a
+stored page stays valid until the templates change. Each process reads the
+file once and keeps the bytes; a missing file is rendered on first request.
+
+Run ``manage.py prerender_pages`` on deploy to write the files ahead of
+the first request.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+
+from .forms import ContactForm
+
+PAGES = {
+    'about_us': ('about_us.html', dict),
+    'faq': ('faq.html', dict),
+    'contact_us': ('contact_us.html', lambda: {'form': ContactForm()}),
+}
+
+_loaded = {}  # name -> bytes, read once per process
+
+
+def page_path(name):
+    return Path(settings.PRERENDERED_PAGES_DIR) / f'{name}.html'
+
+
+def _anonymous_request():
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = AnonymousUser()
+    return request
+
+
+def render_page(name):
+    """Render ``name`` as an anonymous visitor sees it and store the bytes."""
+    template_name, context = PAGES[name]
+    content = render_to_string(template_name, context(), request=_anonymous_request()).encode()
+
+    path = page_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename, so a request never reads a
+    # half-written page.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return content
+
+
+def prerendered_page(name):
+    """Return a response with the stored page, rendering it first if needed."""
+    content = _loaded.get(name)
+    if content is None:
+        try:
+            content = page_path(name).read_bytes()
+        except FileNotFoundError:
+            content = render_page(name)
+        _loaded[name] = content
+    return HttpResponse(content)
@@ -1,3 +1,100 @@
-from django.test import TestCase
+import shutil
+import struct
+import tempfile
+import zlib
+from io import BytesIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .forms import ProfileUpdateForm
+from .models import Account
+
+
+def image_file(size=(400, 200), format='JPEG', name='photo.jpg', **save_options):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, format, **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def png_header(width, height):
+    """A PNG that only has a header, claiming ``width`` x ``height`` pixels."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+class AvatarUploadTests(TestCase):
+
+    def setUp(self):
+        self.user = Account.objects.create_user('avatar', 'avatar@example.com', 'password')
+
+    def form(self, upload):
+        return ProfileUpdateForm(data={'full_name': 'Ava Tar', 'phone_number': ''},
+                                 files={'avatar': upload}, instance=self.user)
+
+    def avatar(self, upload):
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        return Image.open(form.cleaned_data['avatar'])
+
+    def test_stored_as_a_square_webp(self):
+        with override_settings(AVATAR_SIZE=64):
+            avatar = self.avatar(image_file((400, 200)))
+
+        self.assertEqual(avatar.format, 'WEBP')
+        self.assertEqual(avatar.size, (64, 64))
+
+    def test_metadata_is_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        exif[0x0112] = 6  # Orientation: rotated 90°
+        exif.get_ifd(0x8825)[2] = (51.0, 30.0, 0.0)  # GPS latitude
+
+        avatar = self.avatar(image_file((400, 200), exif=exif.tobytes()))
+
+        self.assertNotIn('exif', avatar.info)
+        self.assertEqual(dict(avatar.getexif()), {})
+
+    def test_too_many_pixels_is_rejected(self):
+        with override_settings(AVATAR_MAX_PIXELS=100 * 100):
+            form = self.form(image_file((200, 100)))
+
+            self.assertFalse(form.is_valid())
+        self.assertIn('avatar', form.errors)
+
+    def test_decompression_bomb_is_rejected(self):
+        # Four gigapixels in a few dozen bytes; never decoded
+        form = self.form(SimpleUploadedFile('bomb.png', png_header(65535, 65535)))
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('avatar', form.errors)
+
+    def test_large_file_is_rejected(self):
+        with override_settings(AVATAR_MAX_UPLOAD_SIZE=100):
+            form = self.form(image_file((400, 200)))
+
+            self.assertFalse(form.is_valid())
+        self.assertIn('avatar', form.errors)
+
+    def test_not_an_image_is_rejected(self):
+        form = self.form(SimpleUploadedFile('photo.jpg', b'not an image'))
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('avatar', form.errors)
+
+    def test_profile_update_stores_the_avatar(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.client.force_login(self.user)
+        url = reverse('accounts:my_account')
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(url, {'full_name': 'Ava Tar', 'phone_number': '', 'avatar': image_file()})
+
+            self.assertRedirects(response, url, fetch_redirect_response=False)
+            self.user.refresh_from_db()
+            self.assertEqual(Image.open(self.user.avatar).format, 'WEBP')
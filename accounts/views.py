@@ -4,7 +4,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from .forms import RegisterForm, LoginForm, ProfileUpdateForm, ContactForm
+from .prerender import prerendered_page
 from orders.models import Order
 
 def register_view(request):
@@ -73,8 +76,18 @@ def logout_view(request):
 
 
 @login_required
+@csrf_exempt
 def my_account_view(request):
     """User account dashboard"""
+    # Spool avatar uploads to disk whatever their size. Upload handlers can
+    # only be swapped before the body is read, which CSRF checking does, so
+    # the check runs in _my_account_view instead.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return _my_account_view(request)
+
+
+@csrf_protect
+def _my_account_view(request):
     orders = Order.objects.filter(user=request.user).order_by('-created_at')[:10]
     
     if request.method == 'POST':
@@ -82,7 +95,7 @@ def my_account_view(request):
         if form.is_valid():
             form.save()
             messages.success(request, 'Profile updated successfully!')
-            return redirect('my_account')
+            return redirect('accounts:my_account')
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
@@ -121,16 +134,16 @@ def contact_view(request):
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
-        form = ContactForm()
+        return prerendered_page('contact_us')
     
     return render(request, 'contact_us.html', {'form': form})
 
 
 def about_us_view(request):
     """About us page"""
-    return render(request, 'about_us.html')
+    return prerendered_page('about_us')
 
 
 def faq_view(request):
     """FAQ page"""
-    return render(request, 'faq.html')
+    return prerendered_page('faq')
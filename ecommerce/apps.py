@@ -0,0 +1,12 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig
+
+
+class EcommerceStaticFilesConfig(StaticFilesConfig):
+    # Sources, docs and test suites shipped with the theme plugins. They are
+    # never linked from a page, so collectstatic leaves them out. Directory
+    # patterns match the directory's own name at any depth.
+    ignore_patterns = StaticFilesConfig.ignore_patterns + [
+        'tests', 'docs', 'less', 'scss',
+        '*.less', '*.scss', '*.coffee', '*.md',
+        'Gruntfile.*', 'bower.json', 'package.json', 'install.json',
+    ]
@@ -1,99 +1,64 @@
 import logging
-from orders.models import Cart
-from store.models import Product, Category, SubCategory
+from django.utils.functional import SimpleLazyObject
+from store import page_cache
+from store.categories import get_category_tree
+from store.rails import get_rails
 
 logger = logging.getLogger(__name__)
 
 
-def cart_context(request):
-    """Add cart information to all template contexts"""
-    cart = None
-    cart_items_count = 0
+def lazy_context(request, name, loader):
+    """
+    Defer ``loader`` until a template actually touches the variable.
 
-    try:
-        if request.user.is_authenticated:
-            cart = Cart.objects.filter(user=request.user).first()
-        elif request.session.session_key:
-            cart = Cart.objects.filter(
-                session_key=request.session.session_key).first()
+    The result is memoized on the request, so a variable used in several
+    places, or by several renders during one request, costs one query.
+    """
+    memo = request.__dict__.setdefault('_lazy_context', {})
 
-        if cart:
-            cart_items_count = cart.total_items
-    except Exception as e:
-        logger.exception("Error building cart context")
+    def load():
+        if name not in memo:
+            memo[name] = loader()
+        return memo[name]
 
-    return {
-        'cart': cart,
-        'cart_items_count': cart_items_count,
-    }
+    return SimpleLazyObject(load)
 
 
 def product_context(request):
     """Add product-related context variables"""
-    slider_products = Product.objects.filter(
-        is_active=True, is_slider=True).select_related('category').order_by('-created_at')
-
-    trending_products = Product.objects.filter(
-        is_active=True).select_related('category').order_by('-created_at')[:5]
-    latest_products = Product.objects.filter(
-        is_active=True).select_related('category').order_by('-created_at')[:5]
-    
-    featured_products = Product.objects.filter(
-        is_active=True, is_featured=True).select_related('category').order_by('-created_at')[:5]
-    
-    new_products = Product.objects.filter(
-        is_active=True).select_related('category').order_by('-created_at')[:5]
-    
-    promoted_products = Product.objects.filter(
-        is_active=True, is_promoted=True).select_related('category').order_by('-created_at')[:5]
-    
-    mobile_products = Product.objects.filter(
-        is_active=True, category__name='Mobile').select_related('category').order_by('-created_at')[:5]
+    rails = lazy_context(request, 'rails', get_rails)
 
-
-    def calculate_discount(p):
-        return ((p.compare_price - p.price) / p.compare_price * 100) if p.compare_price and p.compare_price > p.price else 0
-    
-    
-    for product in trending_products:
-        product._discount_percent = calculate_discount(product)
-    for product in featured_products:
-        product._discount_percent = calculate_discount(product)
-    for product in new_products:
-        product._discount_percent = calculate_discount(product)
-    for product in promoted_products:
-        product._discount_percent = calculate_discount(product)
-    for product in mobile_products:
-        product._discount_percent = calculate_discount(product) 
-    for product in latest_products:
-        product._discount_percent = calculate_discount(product)
+    def rail(name):
+        def load():
+            page_cache.tag(request, f'rail:{name}')
+            page_cache.tag_products(request, rails[name])
+            return rails[name]
+        return lazy_context(request, f'rail:{name}', load)
 
     return {
-        'trending_products': trending_products,
-        'featured_products': featured_products,
-        'new_products': new_products,
-        'promoted_products': promoted_products,
-        'mobile_products': mobile_products,
-        'latest_products': latest_products,
-        'slider_products': slider_products,
+        'trending_products': rail('trending'),
+        'featured_products': rail('featured'),
+        'new_products': rail('new'),
+        'promoted_products': rail('promoted'),
+        'mobile_products': rail('mobile'),
+        'latest_products': rail('latest'),
+        'slider_products': rail('slider'),
     }
 
 
 def get_categories(request):
     """Add product categories to context"""
-    categories = Category.objects.filter(is_active=True).order_by('name')
-    mobile_sub_categories = SubCategory.objects.filter(
-        is_active=True, category__name='Mobile').select_related('category').order_by('name')[:4]
-    mobile_sub_categories_all = SubCategory.objects.filter(
-        is_active=True, category__name='Mobile').select_related('category').order_by('name')
-    tablets_sub_categories = SubCategory.objects.filter(
-        is_active=True, category__name='Tablet').select_related('category').order_by('name')
+    page_cache.tag(request, 'categories')
+    tree = lazy_context(request, 'category_tree', get_category_tree)
+
+    def branch(name, size=None):
+        return lazy_context(request, f'category_tree:{name}:{size}', lambda: tree[name][:size])
 
     return {
-        'categories': categories,
+        'categories': branch('categories'),
         "sub_categories": {
-            "Navigation_Mobile": mobile_sub_categories,
-            "Mobile": mobile_sub_categories_all,
-            "Tablets": tablets_sub_categories,
+            "Navigation_Mobile": branch('mobile', 4),
+            "Mobile": branch('mobile'),
+            "Tablets": branch('tablets'),
         },
     }
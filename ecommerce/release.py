@@ -0,0 +1,24 @@
+"""
+Identifier of the deployed code.
+
+Validators and cache keys of rendered pages include it, so a deploy that
+changes templates or views never answers a revalidation with a 304 or a
+cached copy of markup rendered by the previous release.
+"""
+import subprocess
+from functools import cache
+
+from django.conf import settings
+
+
+@cache
+def release_id():
+    """``RELEASE_ID``, or else the git commit being run ('' outside a checkout)."""
+    if settings.RELEASE_ID:
+        return settings.RELEASE_ID
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return ''
+    return result.stdout.strip() if result.returncode == 0 else ''
@@ -0,0 +1,144 @@
+"""
+Serving files from disk in production.
+
+``send_file`` answers a request for one file under a root directory. It
+handles ``If-Modified-Since`` and single byte ranges (``Range``/``If-Range``,
+e.g. seeking in a video or resuming a download) and streams the file in
+``SENDFILE_CHUNK_SIZE`` blocks, so memory use does not grow with the file.
+
+With ``SENDFILE_BACKEND`` set, only the headers are produced and the web
+server sends the bytes itself, ranges included:
+
+* ``'x-accel-redirect'`` (nginx): the response carries the file's URL
+  under an ``internal`` location that maps onto the root, e.g.::
+
+      location /internal/media/ { internal; alias /srv/app/media/; }
+
+* ``'x-sendfile'`` (Apache mod_xsendfile, lighttpd): the response carries
+  the absolute path.
+
+The view deciding whether a file may be seen stays in Django, so the same
+call serves protected files: check the permission, then return
+``send_file(request, root, name, accel_prefix)``.
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.static import was_modified_since
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Content-addressed uploads (see ecommerce.storage) and their resized
+# copies never change under the same name
+CONTENT_ADDRESSED = re.compile(r'(^|/)[0-9a-f]{64}(\.\d+w)?\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=86400'
+
+
+def _byte_range(header, size):
+    """
+    The (start, end) pair, end included, asked for by ``header``; None to
+    send the whole file (no header, several ranges, or one we do not parse),
+    or False if the range lies outside the file.
+    """
+    match = RANGE.match(header.replace(' ', '')) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # The last ``last`` bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(settings.SENDFILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def send_file(request, root, name, accel_prefix=None, cache_control=None):
+    """
+    Respond with the file ``name`` under ``root``. ``accel_prefix`` is the
+    internal nginx location mapped onto ``root``, used with X-Accel-Redirect;
+    without one, the file is streamed from Django.
+    """
+    try:
+        path = Path(safe_join(root, name))
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not path.is_file():
+        raise Http404
+
+    last_modified = http_date(stat.st_mtime)
+    content_type, _ = mimetypes.guess_type(path.name)
+    content_type = content_type or 'application/octet-stream'
+
+    if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.SENDFILE_BACKEND == 'x-accel-redirect' and accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        relative = path.relative_to(os.path.abspath(root)).as_posix()
+        response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(relative)
+    elif settings.SENDFILE_BACKEND == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = str(path)
+    else:
+        byte_range = _byte_range(request.headers.get('Range'), stat.st_size)
+        if_range = request.headers.get('If-Range')
+        if byte_range is not None and if_range and parse_http_date_safe(if_range) != int(stat.st_mtime):
+            # Changed since the client got its part (or an ETag we do not send)
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(_read(path, start, end - start + 1), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            # Under gunicorn the open file goes to wsgi.file_wrapper, which
+            # uses sendfile(2) where it can
+            response = FileResponse(path.open('rb'), content_type=content_type)
+            response.block_size = settings.SENDFILE_CHUNK_SIZE
+
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def serve_media(request, path):
+    """Serve an uploaded file from ``MEDIA_ROOT``."""
+    return send_file(
+        request, settings.MEDIA_ROOT, path,
+        accel_prefix=settings.SENDFILE_MEDIA_PREFIX,
+        cache_control=IMMUTABLE if CONTENT_ADDRESSED.search(path) else REVALIDATE,
+    )
@@ -41,7 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'ecommerce.apps.EcommerceStaticFilesConfig',  # django.contrib.staticfiles minus plugin sources
     
     # Local apps
     'accounts',
@@ -51,12 +51,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'store.generations.GenerationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'ecommerce.preload.PreloadMiddleware',
 ]
 
 ROOT_URLCONF = 'ecommerce.urls'
@@ -73,7 +75,6 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.media',
-                'ecommerce.context_processors.cart_context',  # Custom cart context
                 'ecommerce.context_processors.product_context',  # Product data context
                 'ecommerce.context_processors.get_categories',  # Categories and subcategories
             ],
@@ -134,10 +135,39 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# Hashed names, a manifest and .gz/.br copies (see ecommerce.staticfiles)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'ecommerce.staticfiles.CompressedManifestStaticFilesStorage'
+        if not DEBUG else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Serve STATIC_ROOT from Django when no web server sits in front of gunicorn
+SERVE_STATIC = os.getenv('SERVE_STATIC', 'False') == 'True'
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Widths of the resized copies made of every product image (see store.images)
+IMAGE_DERIVATIVE_WIDTHS = (160, 320, 640, 1024, 1600)
+# Processes resizing uploads, started by each web worker that receives one;
+# 0 to resize inline. Keep it small: N gunicorn workers start N pools.
+IMAGE_PROCESSING_WORKERS = 1
+# Width of the blurred placeholder inlined while an image loads
+IMAGE_PLACEHOLDER_WIDTH = 16
+# Uploaded avatars are stored as AVATAR_SIZE px square WebPs (see accounts.avatars)
+AVATAR_SIZE = 256
+AVATAR_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+AVATAR_MAX_PIXELS = 50_000_000
+# Serve MEDIA_ROOT from Django when DEBUG is off (see ecommerce.sendfile)
+SERVE_MEDIA = os.getenv('SERVE_MEDIA', 'False') == 'True'
+# '' streams files from Django; 'x-accel-redirect' (nginx) or 'x-sendfile'
+# (Apache, lighttpd) leave sending the bytes to the web server
+SENDFILE_BACKEND = os.getenv('SENDFILE_BACKEND', '')
+# nginx internal location aliased to MEDIA_ROOT, for X-Accel-Redirect
+SENDFILE_MEDIA_PREFIX = '/internal/media/'
+SENDFILE_CHUNK_SIZE = 64 * 1024  # Bytes read at a time when Django streams a file
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -172,6 +202,22 @@ LOGOUT_REDIRECT_URL = '/'
 SESSION_COOKIE_AGE = 86400 * 30  # 30 days
 SESSION_SAVE_EVERY_REQUEST = True
 
+# Catalog caching
+# Identifies the deployed code in page ETags and page cache keys (see ecommerce.release);
+# set it per deploy, e.g. to the commit or build number. Defaults to the git commit.
+RELEASE_ID = os.getenv('RELEASE_ID', '')
+RAILS_CACHE_TIMEOUT = 60 * 10  # Homepage rails, invalidated on product changes
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 10  # Header category menus, invalidated on category changes
+PAGE_CACHE_TIMEOUT = 60 * 15  # Anonymous storefront pages, purged by tag
+# Pages, tag versions and the cache statistics live in the default cache. Without CACHES
+# set that is a LocMemCache per process: under gunicorn each worker has its own pages
+# and the admin's page cache statistics count only the worker answering them.
+PRERENDERED_PAGES_DIR = BASE_DIR / 'prerendered'  # About, FAQ and contact pages
+GENERATION_CHECK_INTERVAL = 1  # Seconds between a worker's checks for catalog changes made elsewhere
+CATALOG_READ_BUDGET = 0.5  # Seconds a catalog read may take before the last good copy is served
+STALE_TIMEOUT = 60 * 60 * 24  # How long last good copies are kept
+STALE_REFRESH_TIMEOUT = 60  # Upper bound on one refresh of a stale copy, after which another may start
+
 # Security Settings (for production)
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -0,0 +1,134 @@
+"""
+Fingerprinted, precompressed static files.
+
+``collectstatic`` writes every file under a name containing a hash of its
+content (``css/style.3f9a0c21d7e4.css``) plus a manifest mapping the
+original names to the hashed ones, which ``{% static %}`` uses. A changed
+file gets a new URL, so hashed files can be cached by browsers and CDNs
+forever. Next to each compressible file a gzip copy (``.gz``) and, when the
+``brotli`` package is installed, a brotli copy (``.br``) are written once,
+so requests never compress on the fly.
+
+Behind nginx, point ``location /static/`` at ``STATIC_ROOT`` with
+``gzip_static``/``brotli_static`` on. Deployments without a web server in
+front set ``SERVE_STATIC`` and let ``serve`` below answer ``/static/``.
+"""
+import gzip
+import logging
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Types worth compressing; images and web fonts other than the old
+# formats are compressed already.
+COMPRESSIBLE = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.eot', '.ttf', '.otf'}
+# Below this the headers outweigh the savings
+MIN_COMPRESS_SIZE = 256
+
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# ManifestStaticFilesStorage inserts 12 hex digits before the extension
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Unhashed names (e.g. files linked from third-party CSS without a hash)
+# can change in place on the next deploy
+REVALIDATE = 'public, max-age=3600'
+
+
+def _compress(path):
+    """Write ``path.gz`` and ``path.br`` next to ``path``, keeping only the copies that are smaller."""
+    data = path.read_bytes()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.95:
+            path.with_name(path.name + suffix).write_bytes(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        if brotli is None:
+            logger.warning('The brotli package is not installed; writing gzip copies of static files only')
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if Path(name).suffix.lower() in COMPRESSIBLE and self.exists(name):
+                _compress(Path(self.path(name)))
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """
+    Serve ``path`` from ``STATIC_ROOT``, precompressed when the client
+    accepts it. Hashed names are cached for a year.
+    """
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404
+    if fullpath.suffix in ('.gz', '.br') or not fullpath.is_file():
+        raise Http404
+
+    mtime = fullpath.stat().st_mtime
+    if not was_modified_since(request.headers.get('If-Modified-Since'), mtime):
+        response = HttpResponseNotModified()
+    else:
+        served, encoding = fullpath, None
+        accepted = _accepted_encodings(request)
+        for coding, suffix in ENCODINGS:
+            candidate = fullpath.with_name(fullpath.name + suffix)
+            if coding in accepted and candidate.is_file():
+                served, encoding = candidate, coding
+                break
+        content_type, _ = mimetypes.guess_type(fullpath.name)
+        response = FileResponse(
+            served.open('rb'), filename=fullpath.name,
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(mtime)
+
+    response['Cache-Control'] = IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
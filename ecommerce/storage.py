@@ -0,0 +1,68 @@
+"""
+Content-addressed storage for uploaded images.
+
+Files are stored under the hex SHA-256 of their bytes, in the field's
+``upload_to`` directory: ``products/gallery/3f/3f9a...c2.jpg``. The hash
+is computed while the upload is streamed to a temporary file, so large
+files are never held in memory. If a file with the same bytes already
+exists, the temporary copy is dropped and the existing name is returned.
+Uploading the same picture twice therefore stores it once, and its URL
+stays the same, which helps the browser and CDN caches.
+
+Several rows can point at one blob, so a file must not be deleted along
+with one of the rows using it; ``manage.py collect_media_garbage`` removes
+the files no row references any more.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible(path='ecommerce.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is the content hash, picked in _save
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        os.makedirs(self.path(directory or '.'), exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.path(directory or '.'), suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            hexdigest = digest.hexdigest()
+            name = posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+            path = self.path(name)
+            if os.path.exists(path):
+                # Same bytes already stored. Touched so collect_media_garbage,
+                # which goes by mtime, does not take a blob that was orphaned
+                # before this upload's row is committed.
+                os.remove(tmp)
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp, self.file_permissions_mode)
+                os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return name
+
+
+upload_storage = ContentAddressedStorage()
@@ -0,0 +1,257 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from .ids import uuid7, uuid7_floor
+from .sendfile import _byte_range, send_file
+from .staticfiles import IMMUTABLE, REVALIDATE, serve
+from .storage import ContentAddressedStorage
+
+
+class UUID7Tests(SimpleTestCase):
+
+    def check(self):
+        before = time.time()
+        value = uuid7()
+        after = time.time()
+
+        self.assertIsInstance(value, uuid.UUID)
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+        self.assertLessEqual(int(before * 1000), value.int >> 80)
+        self.assertLessEqual(value.int >> 80, int(after * 1000))
+        self.assertLessEqual(uuid7_floor(before), value)
+
+        later = []
+        while len(later) < 2:
+            time.sleep(0.002)
+            later.append(uuid7())
+        self.assertLess(value, later[0])
+        self.assertLess(later[0], later[1])
+
+    def test_uuid7(self):
+        self.check()
+
+    def test_fallback_without_uuid_uuid7(self):
+        # Python before 3.14
+        with mock.patch('ecommerce.ids.uuid', SimpleNamespace(UUID=uuid.UUID)):
+            self.check()
+
+    def test_floor(self):
+        floor = uuid7_floor(1_700_000_000.5)
+
+        self.assertEqual(floor.version, 7)
+        self.assertEqual(floor.variant, uuid.RFC_4122)
+        self.assertEqual(floor.int >> 80, 1_700_000_000_500)
+        self.assertEqual(floor.int & ((1 << 62) - 1), 0)
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_names_files_by_content(self):
+        name = self.storage.save('products/gallery/phone.JPG', ContentFile(b'image'))
+
+        self.assertRegex(name, r'^products/gallery/([0-9a-f]{2})/\1[0-9a-f]{62}\.jpg$')
+        self.assertEqual(self.storage.open(name).read(), b'image')
+
+    def test_same_bytes_are_stored_once(self):
+        first = self.storage.save('products/gallery/a.jpg', ContentFile(b'image'))
+        second = self.storage.save('products/gallery/b.jpg', ContentFile(b'image'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(os.path.dirname(self.storage.path(first))), [os.path.basename(first)])
+
+    def test_duplicate_upload_refreshes_the_mtime(self):
+        name = self.storage.save('products/gallery/a.jpg', ContentFile(b'image'))
+        os.utime(self.storage.path(name), (0, 0))
+
+        self.storage.save('products/gallery/b.jpg', ContentFile(b'image'))
+
+        self.assertGreater(os.path.getmtime(self.storage.path(name)), 0)
+
+
+class ByteRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        cases = {
+            None: None,
+            '': None,
+            'bytes=0-3': (0, 3),
+            'bytes=4-': (4, 9),
+            'bytes=4-100': (4, 9),  # Clamped to the file
+            'bytes=-3': (7, 9),  # Suffix
+            'bytes=-100': (0, 9),
+            'bytes = 2 - 5': (2, 5),
+            'bytes=10-': False,  # Starts past the end
+            'bytes=5-2': False,
+            'bytes=-0': False,
+            'bytes=-': None,
+            'bytes=0-1,4-5': None,  # Several ranges: whole file
+            'items=0-1': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(_byte_range(header, 10), expected)
+
+
+@override_settings(SENDFILE_BACKEND=None, SENDFILE_CHUNK_SIZE=4)
+class SendFileTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        with open(os.path.join(self.root, 'video.mp4'), 'wb') as f:
+            f.write(b'0123456789')
+        self.mtime = os.path.getmtime(os.path.join(self.root, 'video.mp4'))
+
+    def get(self, name='video.mp4', **headers):
+        return send_file(RequestFactory().get('/', headers=headers), self.root, name)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(Range='bytes=2-7')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234567')
+        self.assertEqual(response['Content-Range'], 'bytes 2-7/10')
+        self.assertEqual(response['Content-Length'], '6')
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-4')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'6789')
+        self.assertEqual(response['Content-Range'], 'bytes 6-9/10')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=10-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_if_range(self):
+        current = self.get(Range='bytes=2-3', **{'If-Range': http_date(self.mtime)})
+        changed = self.get(Range='bytes=2-3', **{'If-Range': http_date(self.mtime - 60)})
+        etag = self.get(Range='bytes=2-3', **{'If-Range': '"abc"'})
+
+        self.assertEqual(current.status_code, 206)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(etag.status_code, 200)
+
+    def test_not_modified(self):
+        response = self.get(**{'If-Modified-Since': http_date(self.mtime + 60)})
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(SENDFILE_BACKEND='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = send_file(RequestFactory().get('/'), self.root, 'video.mp4', accel_prefix='/internal/media/')
+
+        self.assertEqual(response['X-Accel-Redirect'], '/internal/media/video.mp4')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(SENDFILE_BACKEND='x-accel-redirect')
+    def test_x_accel_redirect_without_prefix_streams(self):
+        response = send_file(RequestFactory().get('/'), self.root, 'video.mp4', accel_prefix=None)
+
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_outside_the_root(self):
+        for name in ('../etc/passwd', 'missing.mp4', ''):
+            with self.subTest(name=name), self.assertRaises(Http404):
+                self.get(name)
+
+
+class ServeStaticTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(STATIC_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.root, 'css'))
+        for name, content in (
+            ('css/site.0123456789ab.css', b'body{}'),
+            ('css/site.0123456789ab.css.gz', b'gzip'),
+            ('css/site.0123456789ab.css.br', b'brotli'),
+            ('css/plain.css', b'plain'),
+            ('css/plain.css.gz', b'plain gzip'),
+        ):
+            with open(os.path.join(self.root, name), 'wb') as f:
+                f.write(content)
+
+    def get(self, path, accept_encoding=None, **headers):
+        if accept_encoding is not None:
+            headers['Accept-Encoding'] = accept_encoding
+        return serve(RequestFactory().get('/', headers=headers), path)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_prefers_brotli(self):
+        response = self.get('css/site.0123456789ab.css', 'gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(self.body(response), b'brotli')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_gzip(self):
+        for accept_encoding in ('gzip', 'gzip, br;q=0', 'br;q=0.0, gzip;q=0.5'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get('css/site.0123456789ab.css', accept_encoding)
+
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(self.body(response), b'gzip')
+
+    def test_identity(self):
+        for accept_encoding in (None, '', 'gzip;q=0, br;q=0', 'identity'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get('css/site.0123456789ab.css', accept_encoding)
+
+                self.assertNotIn('Content-Encoding', response)
+                self.assertEqual(self.body(response), b'body{}')
+
+    def test_falls_back_to_the_variants_that_exist(self):
+        response = self.get('css/plain.css', 'br, gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_cache_control(self):
+        self.assertEqual(self.get('css/site.0123456789ab.css')['Cache-Control'], IMMUTABLE)
+        self.assertEqual(self.get('css/plain.css')['Cache-Control'], REVALIDATE)
+
+    def test_not_modified(self):
+        mtime = os.path.getmtime(os.path.join(self.root, 'css/plain.css'))
+
+        response = self.get('css/plain.css', **{'If-Modified-Since': http_date(mtime + 60)})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_not_found(self):
+        for path in ('css/site.0123456789ab.css.gz', 'css/site.0123456789ab.css.br', '../etc/passwd',
+                     'css/missing.css', 'css'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
@@ -0,0 +1,78 @@
+"""
+Per-process cache warm-up.
+
+A freshly booted worker has an empty URL resolver, no compiled templates
+and (with a process-local cache backend) no rails or category tree, so its
+first requests pay for all of them. ``warm_up()`` does that work up front;
+``gunicorn.conf.py`` runs it in each worker before it accepts requests.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+HOT_TEMPLATES = [
+    'index.html',
+    'store/product.html',
+    'store/product_detail.html',
+    'store/includes/product_card.html',
+]
+
+
+def _resolver():
+    resolver = get_resolver()
+    resolver.resolve('/')
+    reverse('store:home')
+
+
+def _templates():
+    for name in HOT_TEMPLATES:
+        get_template(name)
+
+
+def _catalog():
+    from store import generations
+    from store.categories import get_category_tree
+    from store.rails import get_rails
+
+    generations.sync(force=True)
+    get_category_tree()
+    get_rails()
+
+
+STEPS = [
+    ('url resolver', _resolver),
+    ('templates', _templates),
+    ('catalog caches', _catalog),
+]
+
+
+@contextmanager
+def _timed(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+def warm_up():
+    """Run every warm-up step and return how long each took, in seconds."""
+    timings = {}
+    for name, step in STEPS:
+        with _timed(timings, name):
+            try:
+                step()
+            except Exception:
+                # A cold cache is slower, not broken: never keep a worker from starting
+                logger.exception('Warm-up step %s failed', name)
+    # The worker's request cycle opens its own connections
+    connections.close_all()
+    logger.info('Warm-up took %.0f ms (%s)', sum(timings.values()) * 1000,
+                ', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in timings.items()))
+    return timings
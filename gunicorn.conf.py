@@ -0,0 +1,9 @@
+# Gunicorn loads this file from the working directory: `gunicorn ecommerce.wsgi`
+
+
+def post_worker_init(worker):
+    """Warm this worker's caches after the app is loaded, before it accepts requests."""
+    from ecommerce.warmup import warm_up
+
+    timings = warm_up()
+    worker.log.info('Worker %s warmed up in %.0f ms', worker.pid, sum(timings.values()) * 1000)
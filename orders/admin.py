@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
 from .models import Order, OrderItem, Cart, CartItem
 
 
@@ -46,6 +48,11 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'updated_at']
     inlines = [CartItemInline]
     
+    def get_queryset(self, request):
+        # One query for the whole changelist instead of one per cart
+        return super().get_queryset(request).annotate(items_quantity=Coalesce(Sum('items__quantity'), 0))
+    
     def total_items(self, obj):
-        return obj.total_items
+        return obj.items_quantity
     total_items.short_description = 'Total Items'
+    total_items.admin_order_field = 'items_quantity'
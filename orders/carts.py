@@ -0,0 +1,227 @@
+"""
+Shopping carts of signed-in users and anonymous visitors.
+
+A signed-in user's cart is a ``Cart`` row. An anonymous visitor's cart
+lives in the session as ``{product id: quantity}`` and costs no rows, so
+bots and one-page visitors never write to the ``carts`` table, and a
+visitor without a cart never gets a session. It becomes a ``Cart`` when
+checkout starts (``materialize``), since the payment steps and Stripe's
+callback need a row to point at; the session then only keeps its id.
+
+On login the anonymous cart is merged into the user's cart in one bulk
+upsert (see ``merge``, connected to ``user_logged_in`` in ``signals``).
+
+``items`` and ``summary`` are memoized on the request, so the views and
+templates of one request share one load; changing the cart drops them.
+"""
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+
+from store.models import Product
+
+from .models import Cart, CartItem, cart_totals
+
+# {product id: quantity} of an anonymous visitor's cart
+SESSION_KEY = 'cart'
+# Id of the Cart an anonymous visitor's cart became at checkout
+CART_ID_KEY = 'cart_id'
+
+
+class Summary(NamedTuple):
+    total_items: int  # Sum of the quantities
+    subtotal: Decimal
+
+
+def _in_session(request):
+    return not request.user.is_authenticated and CART_ID_KEY not in request.session
+
+
+def _db_items(request):
+    """The ``CartItem``s of a cart that is a row, found without loading the ``Cart`` first."""
+    if request.user.is_authenticated:
+        return CartItem.objects.filter(cart__user=request.user)
+    return CartItem.objects.filter(cart_id=request.session[CART_ID_KEY], cart__user=None)
+
+
+def _changed(request):
+    request.__dict__.pop('_cart_items', None)
+    request.__dict__.pop('_cart_summary', None)
+
+
+def get_cart(request):
+    """The visitor's ``Cart`` row, or None while the cart is in the session or empty."""
+    if request.user.is_authenticated:
+        return Cart.objects.filter(user=request.user).first()
+    cart_id = request.session.get(CART_ID_KEY)
+    if cart_id:
+        cart = Cart.objects.filter(pk=cart_id, user=None).first()
+        if cart is None:
+            # Deleted meanwhile; start over in the session
+            del request.session[CART_ID_KEY]
+        return cart
+    return None
+
+
+def _load_items(request):
+    if _in_session(request):
+        lines = request.session.get(SESSION_KEY, {})
+        if not lines:
+            return []
+        products = Product.objects.filter(pk__in=lines).select_related('category').prefetch_related('images')
+        order = list(lines)
+        return sorted(
+            (CartItem(product=product, quantity=lines[str(product.pk)]) for product in products),
+            key=lambda item: order.index(str(item.product_id)),
+        )
+    return list(
+        _db_items(request).select_related('product__category').prefetch_related('product__images')
+        .order_by('created_at')
+    )
+
+
+def items(request):
+    """
+    The lines of the visitor's cart with their products loaded, as
+    ``CartItem``s; unsaved ones for a cart still in the session.
+    """
+    if '_cart_items' not in request.__dict__:
+        request._cart_items = _load_items(request)
+    return request._cart_items
+
+
+def summary(request):
+    """
+    Number of items and subtotal of the visitor's cart: one aggregate
+    query, or none when this request already loaded the lines.
+    """
+    if '_cart_summary' in request.__dict__:
+        return request._cart_summary
+    if '_cart_items' in request.__dict__:
+        lines = request._cart_items
+        result = Summary(sum(item.quantity for item in lines), sum((item.subtotal for item in lines), Decimal('0.00')))
+    elif _in_session(request):
+        lines = request.session.get(SESSION_KEY, {})
+        prices = Product.objects.filter(pk__in=lines).values_list('pk', 'price') if lines else []
+        result = Summary(
+            sum(lines[str(pk)] for pk, _ in prices),
+            sum((price * lines[str(pk)] for pk, price in prices), Decimal('0.00')),
+        )
+    else:
+        result = Summary(**cart_totals(_db_items(request)))
+    request._cart_summary = result
+    return result
+
+
+def is_empty(request):
+    if _in_session(request):
+        return not request.session.get(SESSION_KEY)
+    return not _db_items(request).exists()
+
+
+def quantity_of(request, product):
+    """How many of ``product`` are in the visitor's cart."""
+    if _in_session(request):
+        return request.session.get(SESSION_KEY, {}).get(str(product.pk), 0)
+    return _db_items(request).filter(product=product).values_list('quantity', flat=True).first() or 0
+
+
+def set_quantity(request, product, quantity):
+    """Put ``quantity`` of ``product`` in the visitor's cart; 0 removes it."""
+    _changed(request)
+    if _in_session(request):
+        lines = dict(request.session.get(SESSION_KEY, {}))
+        if quantity > 0:
+            lines[str(product.pk)] = quantity
+        else:
+            lines.pop(str(product.pk), None)
+        if lines:
+            request.session[SESSION_KEY] = lines
+        else:
+            request.session.pop(SESSION_KEY, None)
+        return
+
+    cart = get_cart(request)
+    if cart is None:
+        if not request.user.is_authenticated:
+            # The checkout cart was deleted (see get_cart), so this visitor is back to a session cart
+            return set_quantity(request, product, quantity)
+        cart = Cart.objects.create(user=request.user)
+    if quantity > 0:
+        CartItem.objects.update_or_create(cart=cart, product=product, defaults={'quantity': quantity})
+    else:
+        CartItem.objects.filter(cart=cart, product=product).delete()
+
+
+def materialize(request):
+    """The visitor's ``Cart`` row, created from the session cart if needed. Used when checkout starts."""
+    if request.user.is_authenticated:
+        cart, _ = Cart.objects.get_or_create(user=request.user)
+        return cart
+    cart = get_cart(request)
+    if cart is not None:
+        return cart
+
+    if not request.session.session_key:
+        request.session.create()
+    lines = request.session.get(SESSION_KEY, {})
+    with transaction.atomic():
+        cart = Cart.objects.create(session_key=request.session.session_key)
+        # Products deleted since they were added are dropped
+        product_ids = Product.objects.filter(pk__in=lines).values_list('pk', flat=True)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product_id=product_id, quantity=lines[str(product_id)])
+            for product_id in product_ids
+        )
+    request.session[CART_ID_KEY] = str(cart.pk)
+    request.session.pop(SESSION_KEY, None)
+    _changed(request)
+    return cart
+
+
+def clear(request, cart):
+    """Empty ``cart`` after an order was placed from it."""
+    _changed(request)
+    if cart.user_id is None:
+        cart.delete()
+        request.session.pop(CART_ID_KEY, None)
+    else:
+        cart.items.all().delete()
+
+
+def merge(request, user):
+    """
+    Add the cart the visitor filled before signing in to ``user``'s cart,
+    capped at the stock, in one upsert. The anonymous cart is emptied.
+    """
+    _changed(request)
+    lines = dict(request.session.get(SESSION_KEY, {}))
+    anonymous = None
+    if cart_id := request.session.get(CART_ID_KEY):
+        anonymous = Cart.objects.filter(pk=cart_id, user=None).first()
+        if anonymous is not None:
+            for product_id, quantity in anonymous.items.values_list('product_id', 'quantity'):
+                lines[str(product_id)] = lines.get(str(product_id), 0) + quantity
+    request.session.pop(SESSION_KEY, None)
+    request.session.pop(CART_ID_KEY, None)
+    if not lines:
+        if anonymous is not None:
+            anonymous.delete()
+        return
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        stock = dict(Product.objects.filter(pk__in=lines).values_list('pk', 'stock'))
+        existing = dict(cart.items.filter(product__in=stock).values_list('product_id', 'quantity'))
+        merged = [
+            CartItem(cart=cart, product_id=product_id,
+                     quantity=min(existing.get(product_id, 0) + lines[str(product_id)], available))
+            for product_id, available in stock.items()
+            if available > 0
+        ]
+        CartItem.objects.bulk_create(
+            merged, update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity', 'updated_at'],
+        )
+        if anonymous is not None:
+            anonymous.delete()
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
-import uuid
+from ecommerce.ids import uuid7
 
 
 class Order(models.Model):
@@ -20,7 +24,7 @@ class Order(models.Model):
         ('refunded', 'Refunded'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.ForeignKey('accounts.Account', on_delete=models.CASCADE, related_name='orders', null=True, blank=True)
     order_number = models.CharField(max_length=50, unique=True, blank=True)
     
@@ -58,6 +62,11 @@ class Order(models.Model):
         verbose_name = 'Order'
         verbose_name_plural = 'Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='orders_user_recent_idx'),
+            models.Index(fields=['stripe_payment_intent'], condition=models.Q(stripe_payment_intent__isnull=False),
+                         name='orders_payment_intent_idx'),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number}"
@@ -67,13 +76,15 @@ class Order(models.Model):
             # Generate order number
             import datetime
             timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-            self.order_number = f'ORD-{timestamp}-{str(self.id)[:8].upper()}'
+            # The leading hex digits of a time-ordered id repeat for orders placed
+            # close together, so take the random tail instead
+            self.order_number = f'ORD-{timestamp}-{self.id.hex[-8:].upper()}'
         super().save(*args, **kwargs)
 
 
 class OrderItem(models.Model):
     """Items in an order"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey('store.Product', on_delete=models.CASCADE)
     product_name = models.CharField(max_length=255)  # Store name in case product is deleted
@@ -96,7 +107,7 @@ class OrderItem(models.Model):
 
 class Cart(models.Model):
     """Shopping cart"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     user = models.OneToOneField('accounts.Account', on_delete=models.CASCADE, related_name='cart', null=True, blank=True)
     session_key = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -106,22 +117,26 @@ class Cart(models.Model):
         db_table = 'carts'
         verbose_name = 'Cart'
         verbose_name_plural = 'Carts'
+        indexes = [
+            models.Index(fields=['session_key'], condition=models.Q(session_key__isnull=False),
+                         name='carts_session_key_idx'),
+        ]
     
     def __str__(self):
         return f"Cart {self.id}"
     
     @property
     def subtotal(self):
-        return sum(item.subtotal for item in self.items.all())
+        return cart_totals(self.items.all())['subtotal']
     
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return cart_totals(self.items.all())['total_items']
 
 
 class CartItem(models.Model):
     """Items in shopping cart"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey('store.Product', on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
@@ -140,3 +155,19 @@ class CartItem(models.Model):
     @property
     def subtotal(self):
         return self.product.price * self.quantity
+
+
+def cart_totals(items):
+    """
+    ``total_items`` (the sum of the quantities) and ``subtotal`` of the
+    ``CartItem`` queryset ``items``, in one aggregate query.
+    """
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    totals = items.aggregate(
+        total_items=Coalesce(Sum('quantity'), 0),
+        subtotal=Coalesce(Sum(F('quantity') * F('product__price'), output_field=price), Value(Decimal('0.00')),
+                          output_field=price),
+    )
+    # SQLite computes the sum in floating point and drops trailing zeros
+    totals['subtotal'] = Decimal(totals['subtotal']).quantize(Decimal('0.01'))
+    return totals
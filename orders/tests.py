@@ -1,3 +1,239 @@
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Account
+from store.models import Category, Product
+
+from . import carts
+from .models import Cart, CartItem
+
+
+class CartTestCase(TestCase):
+
+    def setUp(self):
+        category = Category.objects.create(name='Phones')
+        self.phone = Product.objects.create(name='Phone', category=category, price='100.00', stock=5)
+        self.case = Product.objects.create(name='Case', category=category, price='10.00', stock=3)
+        self.charger = Product.objects.create(name='Charger', category=category, price='20.00', stock=0)
+        self.user = Account.objects.create_user('buyer', 'buyer@example.com', 'password')
+
+    def request(self, user=None):
+        request = RequestFactory().get('/')
+        SessionMiddleware(lambda request: None).process_request(request)
+        request.user = user or AnonymousUser()
+        return request
+
+    def lines(self, cart):
+        return dict(cart.items.values_list('product__name', 'quantity'))
+
+
+class SessionCartTests(CartTestCase):
+
+    def test_anonymous_cart_stays_in_the_session(self):
+        request = self.request()
+
+        carts.set_quantity(request, self.phone, 2)
+        carts.set_quantity(request, self.case, 1)
+        carts.set_quantity(request, self.case, 0)
+
+        self.assertEqual(request.session[carts.SESSION_KEY], {str(self.phone.pk): 2})
+        self.assertFalse(Cart.objects.exists())
+        self.assertEqual(carts.summary(request), carts.Summary(2, 200))
+
+    def test_deleted_checkout_cart_falls_back_to_the_session(self):
+        request = self.request()
+        carts.set_quantity(request, self.phone, 2)
+        carts.materialize(request).delete()
+
+        carts.set_quantity(request, self.case, 1)
+
+        self.assertNotIn(carts.CART_ID_KEY, request.session)
+        self.assertEqual(request.session[carts.SESSION_KEY], {str(self.case.pk): 1})
+        self.assertFalse(Cart.objects.exists())
+
+
+class MaterializeTests(CartTestCase):
+
+    def test_creates_a_cart_from_the_session(self):
+        request = self.request()
+        carts.set_quantity(request, self.phone, 2)
+        carts.set_quantity(request, self.case, 1)
+
+        cart = carts.materialize(request)
+
+        self.assertIsNone(cart.user)
+        self.assertEqual(cart.session_key, request.session.session_key)
+        self.assertEqual(self.lines(cart), {'Phone': 2, 'Case': 1})
+        self.assertEqual(request.session[carts.CART_ID_KEY], str(cart.pk))
+        self.assertNotIn(carts.SESSION_KEY, request.session)
+        # Later calls and changes use the row
+        self.assertEqual(carts.materialize(request), cart)
+        carts.set_quantity(request, self.phone, 4)
+        self.assertEqual(self.lines(cart), {'Phone': 4, 'Case': 1})
+
+    def test_drops_deleted_products(self):
+        request = self.request()
+        carts.set_quantity(request, self.phone, 2)
+        carts.set_quantity(request, self.case, 1)
+        self.case.delete()
+
+        cart = carts.materialize(request)
+
+        self.assertEqual(self.lines(cart), {'Phone': 2})
+
+    def test_signed_in_user_gets_their_cart(self):
+        request = self.request(self.user)
+
+        cart = carts.materialize(request)
+
+        self.assertEqual(cart.user, self.user)
+        self.assertEqual(carts.materialize(request), cart)
+
+
+class MergeTests(CartTestCase):
+
+    def test_adds_the_session_cart_to_the_user_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.phone, quantity=1)
+        request = self.request()
+        carts.set_quantity(request, self.phone, 2)
+        carts.set_quantity(request, self.case, 1)
+
+        carts.merge(request, self.user)
+
+        self.assertEqual(self.lines(cart), {'Phone': 3, 'Case': 1})
+        self.assertNotIn(carts.SESSION_KEY, request.session)
+
+    def test_caps_quantities_at_the_stock(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.phone, quantity=4)
+        request = self.request()
+        carts.set_quantity(request, self.phone, 3)
+        carts.set_quantity(request, self.case, 7)
+
+        carts.merge(request, self.user)
+
+        self.assertEqual(self.lines(cart), {'Phone': 5, 'Case': 3})
+
+    def test_drops_products_out_of_stock(self):
+        request = self.request()
+        carts.set_quantity(request, self.phone, 1)
+        carts.set_quantity(request, self.charger, 2)
+
+        carts.merge(request, self.user)
+
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Phone': 1})
+
+    def test_merges_and_deletes_the_checkout_cart(self):
+        request = self.request()
+        carts.set_quantity(request, self.phone, 2)
+        anonymous = carts.materialize(request)
+
+        carts.merge(request, self.user)
+
+        self.assertFalse(Cart.objects.filter(pk=anonymous.pk).exists())
+        self.assertNotIn(carts.CART_ID_KEY, request.session)
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Phone': 2})
+
+    def test_empty_session_cart_changes_nothing(self):
+        carts.merge(self.request(), self.user)
+
+        self.assertFalse(Cart.objects.exists())
+
+
+class CartApiTests(CartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def post(self, name, product, **data):
+        return self.client.post(reverse(f'orders:{name}', args=[product.pk]), data)
+
+    def test_add(self):
+        response = self.post('cart_api_add', self.phone, quantity=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'cart': {'total_items': 2, 'subtotal': '200.00'},
+            'line': {'product_id': str(self.phone.pk), 'quantity': 2, 'price': '100.00',
+                     'subtotal': '200.00', 'stock': 5},
+            'message': 'Phone added to cart!',
+        })
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Phone': 2})
+
+    def test_add_beyond_the_stock_is_a_conflict(self):
+        self.post('cart_api_add', self.case, quantity=2)
+
+        response = self.post('cart_api_add', self.case, quantity=4)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['line']['quantity'], 2)
+        self.assertEqual(response.json()['message'], 'Not enough stock available.')
+
+    def test_set_quantity(self):
+        self.post('cart_api_add', self.phone)
+
+        response = self.post('cart_api_set_quantity', self.phone, quantity=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['line']['quantity'], 3)
+        self.assertEqual(response.json()['cart'], {'total_items': 3, 'subtotal': '300.00'})
+
+    def test_set_quantity_is_capped_at_the_stock(self):
+        self.post('cart_api_add', self.case)
+
+        response = self.post('cart_api_set_quantity', self.case, quantity=7)
+
+        self.assertEqual(response.json()['line']['quantity'], 3)
+        self.assertEqual(response.json()['message'], 'Maximum stock reached.')
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Case': 3})
+
+    def test_set_quantity_not_in_the_cart_is_not_found(self):
+        response = self.post('cart_api_set_quantity', self.phone, quantity=1)
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_remove(self):
+        self.post('cart_api_add', self.phone)
+        self.post('cart_api_add', self.case)
+
+        response = self.post('cart_api_remove', self.phone)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()['line'])
+        self.assertEqual(response.json()['cart'], {'total_items': 1, 'subtotal': '10.00'})
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Case': 1})
+
+    def test_summary(self):
+        self.post('cart_api_add', self.phone, quantity=2)
+        self.post('cart_api_add', self.case)
+
+        response = self.client.get(reverse('orders:cart_api_summary'))
+
+        self.assertEqual(response.json(), {'cart': {'total_items': 3, 'subtotal': '210.00'}})
+
+    def test_bad_quantity_is_rejected(self):
+        self.post('cart_api_add', self.phone)
+
+        for name, quantity in [('cart_api_add', 'two'), ('cart_api_add', 0), ('cart_api_add', -1),
+                               ('cart_api_set_quantity', ''), ('cart_api_set_quantity', -1)]:
+            with self.subTest(name=name, quantity=quantity):
+                response = self.post(name, self.phone, quantity=quantity)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.lines(Cart.objects.get(user=self.user)), {'Phone': 1})
+
+    def test_anonymous_cart_stays_in_the_session(self):
+        self.client.logout()
+
+        self.post('cart_api_add', self.phone, quantity=2)
+        self.post('cart_api_add', self.case)
+        response = self.post('cart_api_set_quantity', self.case, quantity=0)
+
+        self.assertEqual(response.json()['cart'], {'total_items': 2, 'subtotal': '200.00'})
+        self.assertEqual(self.client.session[carts.SESSION_KEY], {str(self.phone.pk): 2})
+        self.assertFalse(Cart.objects.exists())
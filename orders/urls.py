@@ -5,8 +5,13 @@ app_name = 'orders'
 
 urlpatterns = [
     path('cart/', views.cart_view, name='cart'),
+    path('cart/summary/', views.cart_summary_view, name='cart_summary'),
     path('add-to-cart/<uuid:product_id>/', views.add_to_cart, name='add_to_cart'),
-    path('update-cart/<uuid:item_id>/', views.update_cart_item, name='update_cart_item'),
+    path('update-cart/<uuid:product_id>/', views.update_cart_item, name='update_cart_item'),
+    path('cart/api/', views.cart_api_summary, name='cart_api_summary'),
+    path('cart/api/add/<uuid:product_id>/', views.cart_api_add, name='cart_api_add'),
+    path('cart/api/items/<uuid:product_id>/', views.cart_api_set_quantity, name='cart_api_set_quantity'),
+    path('cart/api/items/<uuid:product_id>/remove/', views.cart_api_remove, name='cart_api_remove'),
     path('checkout/info/', views.checkout_info_view, name='checkout_info'),
     path('checkout/payment/', views.checkout_payment_view, name='checkout_payment'),
     path('checkout/success/', views.checkout_success_view, name='checkout_success'),
@@ -2,112 +2,206 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse, HttpResponse
+from django.http import Http404, JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_POST
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
 from django.core.mail import send_mail
 from decimal import Decimal
 import stripe
 import json
 
-from .models import Cart, CartItem, Order, OrderItem
+from . import carts
+from .models import Order, OrderItem
 from store.models import Product
 from .forms import CheckoutForm
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
-def get_or_create_cart(request):
-    """Get or create cart for user or session"""
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-    else:
-        if not request.session.session_key:
-            request.session.create()
-        session_key = request.session.session_key
-        cart, created = Cart.objects.get_or_create(session_key=session_key)
-    return cart
+@never_cache
+def cart_summary_view(request):
+    """Per-visitor header data (cart badge, mini-cart, login state) as JSON"""
+    cart_items = carts.items(request)
+    
+    return JsonResponse({
+        'authenticated': request.user.is_authenticated,
+        'cart_items_count': carts.summary(request).total_items,
+        'mini_cart': render_to_string('orders/includes/mini_cart.html', {'cart_items': cart_items}, request=request),
+        'csrf_token': get_token(request),
+    })
 
 
 def cart_view(request):
     """Shopping cart view"""
-    cart = get_or_create_cart(request)
-    cart_items = cart.items.all()
+    cart_items = carts.items(request)
     
     # Handle proceed to checkout
     if request.method == 'POST' and 'proceed_checkout' in request.POST:
-        if not cart_items.exists():
+        if not cart_items:
             messages.warning(request, 'Your cart is empty.')
             return redirect('orders:cart')
         return redirect('orders:checkout_info')
     
     context = {
-        'cart': cart,
         'cart_items': cart_items,
+        'subtotal': carts.summary(request).subtotal,
     }
     return render(request, 'orders/checkout_cart.html', context)
 
 
+def _add(request, product, quantity):
+    """
+    Add ``quantity`` of ``product`` to the cart, up to the stock. Returns
+    the new quantity in the cart and a warning, or None and an error.
+    """
+    if product.stock < quantity:
+        return None, 'Not enough stock available.'
+    quantity += carts.quantity_of(request, product)
+    warning = None
+    if quantity > product.stock:
+        quantity = product.stock
+        warning = f'Only {product.stock} items available.'
+    carts.set_quantity(request, product, quantity)
+    return quantity, warning
+
+
 def add_to_cart(request, product_id):
     """Add product to cart"""
     product = get_object_or_404(Product, id=product_id, is_active=True)
-    cart = get_or_create_cart(request)
     
     quantity = int(request.POST.get('quantity', 1))
     
-    if product.stock < quantity:
-        messages.error(request, 'Not enough stock available.')
+    quantity, warning = _add(request, product, quantity)
+    if quantity is None:
+        messages.error(request, warning)
         return redirect('store:product_detail', slug=product.slug)
+    if warning:
+        messages.warning(request, warning)
     
-    cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-    
-    if not created:
-        cart_item.quantity += quantity
-        if cart_item.quantity > product.stock:
-            cart_item.quantity = product.stock
-            messages.warning(request, f'Only {product.stock} items available.')
-    else:
-        cart_item.quantity = quantity
-    
-    cart_item.save()
     messages.success(request, f'{product.name} added to cart!')
     
     return redirect('orders:cart')
 
 
-def update_cart_item(request, item_id):
+def update_cart_item(request, product_id):
     """Update cart item quantity"""
-    cart = get_or_create_cart(request)
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+    product = get_object_or_404(Product, id=product_id)
+    quantity = carts.quantity_of(request, product)
+    if not quantity:
+        raise Http404('Not in the cart')
     
     action = request.POST.get('action')
     
     if action == 'increase':
-        if cart_item.quantity < cart_item.product.stock:
-            cart_item.quantity += 1
-            cart_item.save()
+        if quantity < product.stock:
+            carts.set_quantity(request, product, quantity + 1)
         else:
             messages.warning(request, 'Maximum stock reached.')
     elif action == 'decrease':
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-            cart_item.save()
+        if quantity > 1:
+            carts.set_quantity(request, product, quantity - 1)
         else:
-            cart_item.delete()
+            carts.set_quantity(request, product, 0)
             messages.info(request, 'Item removed from cart.')
     elif action == 'remove':
-        cart_item.delete()
+        carts.set_quantity(request, product, 0)
         messages.info(request, 'Item removed from cart.')
     
     return redirect('orders:cart')
 
 
+def _cart_json(request, product=None, quantity=0, message=None, status=200):
+    """The cart totals, and the line of ``product`` if given, as a JSON response"""
+    summary = carts.summary(request)
+    data = {
+        'cart': {
+            'total_items': summary.total_items,
+            'subtotal': str(summary.subtotal),
+        },
+    }
+    if product is not None:
+        data['line'] = {
+            'product_id': str(product.pk),
+            'quantity': quantity,
+            'price': str(product.price),
+            'subtotal': str(product.price * quantity),
+            'stock': product.stock,
+        } if quantity else None
+    if message:
+        data['message'] = message
+    return JsonResponse(data, status=status)
+
+
+def _posted_quantity(request, default=None):
+    try:
+        quantity = int(request.POST.get('quantity', default))
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity >= 0 else None
+
+
+@never_cache
+def cart_api_summary(request):
+    """Cart totals as JSON"""
+    return _cart_json(request)
+
+
+@never_cache
+@require_POST
+def cart_api_add(request, product_id):
+    """Add ``quantity`` (default 1) of a product; returns its line and the cart totals"""
+    product = get_object_or_404(Product, id=product_id, is_active=True)
+    quantity = _posted_quantity(request, default=1)
+    if not quantity:
+        return JsonResponse({'error': 'Quantity must be a positive number.'}, status=400)
+    
+    quantity, warning = _add(request, product, quantity)
+    if quantity is None:
+        return _cart_json(request, product, carts.quantity_of(request, product), warning, status=409)
+    return _cart_json(request, product, quantity, warning or f'{product.name} added to cart!')
+
+
+@never_cache
+@require_POST
+def cart_api_set_quantity(request, product_id):
+    """Set the quantity of a product in the cart, 0 to remove it; returns its line and the cart totals"""
+    product = get_object_or_404(Product, id=product_id)
+    if not carts.quantity_of(request, product):
+        raise Http404('Not in the cart')
+    quantity = _posted_quantity(request)
+    if quantity is None:
+        return JsonResponse({'error': 'Quantity must be zero or a positive number.'}, status=400)
+    
+    if quantity and not product.is_active:
+        raise Http404('Product not available')
+    message = None
+    if quantity > product.stock:
+        quantity = product.stock
+        message = 'Maximum stock reached.'
+    carts.set_quantity(request, product, quantity)
+    if not quantity:
+        message = 'Item removed from cart.'
+    return _cart_json(request, product, quantity, message)
+
+
+@never_cache
+@require_POST
+def cart_api_remove(request, product_id):
+    """Remove a product from the cart; returns the cart totals"""
+    product = get_object_or_404(Product, id=product_id)
+    carts.set_quantity(request, product, 0)
+    return _cart_json(request, product, 0, 'Item removed from cart.')
+
+
 def checkout_info_view(request):
     """Checkout information step"""
-    cart = get_or_create_cart(request)
-    
-    if not cart.items.exists():
+    if carts.is_empty(request):
         messages.warning(request, 'Your cart is empty.')
         return redirect('orders:cart')
+    cart = carts.materialize(request)
     
     if request.method == 'POST':
         form = CheckoutForm(request.POST, user=request.user)
@@ -140,11 +234,10 @@ def checkout_payment_view(request):
     """Checkout payment step with Stripe"""
     print(f"checkout_payment_view called - Method: {request.method}")
     
-    cart = get_or_create_cart(request)
-    
-    if not cart.items.exists():
+    if carts.is_empty(request):
         messages.warning(request, 'Your cart is empty.')
         return redirect('orders:cart')
+    cart = carts.materialize(request)
     
     # Validate shipping address exists in session
     checkout_data = request.session.get('checkout_data')
@@ -160,7 +253,8 @@ def checkout_payment_view(request):
         messages.warning(request, 'Please complete all shipping information fields.')
         return redirect('orders:checkout_info')
     
-    subtotal = cart.subtotal
+    cart_items = carts.items(request)
+    subtotal = carts.summary(request).subtotal
     shipping_cost = Decimal('10.00')  
     tax = round(subtotal * Decimal('0.10'),2)  
     total = subtotal + shipping_cost + tax
@@ -168,13 +262,12 @@ def checkout_payment_view(request):
     if request.method == 'POST':
         try:
             line_items = []
-            for item in cart.items.all():
-                # Get product image URL if available
+            for item in cart_items:
+                # Get product image URL if available (images are prefetched)
                 image_url = None
-                if hasattr(item.product, 'images') and item.product.images.exists():
-                    first_image = item.product.images.first()
-                    if first_image and hasattr(first_image, 'image'):
-                        image_url = request.build_absolute_uri(first_image.image.url)
+                product_images = item.product.images.all()
+                if product_images:
+                    image_url = request.build_absolute_uri(product_images[0].image.url)
                 
                 line_items.append({
                     'price_data': {
@@ -244,6 +337,7 @@ def checkout_payment_view(request):
     
     context = {
         'cart': cart,
+        'cart_items': cart_items,
         'subtotal': subtotal,
         'shipping_cost': shipping_cost,
         'tax': tax,
@@ -268,7 +362,7 @@ def checkout_success_view(request):
             messages.error(request, 'Payment was not successful.')
             return redirect('orders:checkout_payment')
         
-        cart = get_or_create_cart(request)
+        cart = carts.materialize(request)
         checkout_data = request.session.get('checkout_data')
         
         if not checkout_data:
@@ -281,7 +375,7 @@ def checkout_success_view(request):
             # Order already created, redirect to completion page
             return redirect(f'/orders/checkout/complete/?order_number={existing_order.order_number}')
         
-        subtotal = cart.subtotal
+        subtotal = carts.summary(request).subtotal
         shipping_cost = Decimal('10.00')
         tax = subtotal * Decimal('0.10')
         total = subtotal + shipping_cost + tax
@@ -306,7 +400,7 @@ def checkout_success_view(request):
             status='processing'
         )
         
-        for cart_item in cart.items.all():
+        for cart_item in carts.items(request):
             OrderItem.objects.create(
                 order=order,
                 product=cart_item.product,
@@ -317,7 +411,7 @@ def checkout_success_view(request):
             
             product = cart_item.product
             product.stock -= cart_item.quantity
-            product.save()
+            product.save(update_fields=['stock', 'updated_at'])
             
         try:
             send_mail(
@@ -342,7 +436,7 @@ Best regards,
             print(f"Email error: {e}")
         
         # Clear cart
-        cart.items.all().delete()
+        carts.clear(request, cart)
         
         # Clear session data
         if 'checkout_data' in request.session:
@@ -365,7 +459,7 @@ Best regards,
 def create_order(request):
     """Create order after successful payment"""
     if request.method == 'POST':
-        cart = get_or_create_cart(request)
+        cart = carts.materialize(request)
         checkout_data = request.session.get('checkout_data')
         payment_intent_id = request.POST.get('payment_intent_id')
         
@@ -375,7 +469,7 @@ def create_order(request):
         if not payment_intent_id:
             return JsonResponse({'error': 'Payment information missing.'}, status=400)
         
-        subtotal = cart.subtotal
+        subtotal = carts.summary(request).subtotal
         shipping_cost = Decimal('10.00')
         tax = subtotal * Decimal('0.10')
         total = subtotal + shipping_cost + tax
@@ -399,7 +493,7 @@ def create_order(request):
             status='processing'
         )
         
-        for cart_item in cart.items.all():
+        for cart_item in carts.items(request):
             OrderItem.objects.create(
                 order=order,
                 product=cart_item.product,
@@ -411,7 +505,7 @@ def create_order(request):
             # Update product stock
             product = cart_item.product
             product.stock -= cart_item.quantity
-            product.save()
+            product.save(update_fields=['stock', 'updated_at'])
         
         # Send confirmation email
         try:
@@ -438,7 +532,7 @@ def create_order(request):
             pass
         
         # Clear cart
-        cart.items.all().delete()
+        carts.clear(request, cart)
         
         # Clear session data
         if 'checkout_data' in request.session:
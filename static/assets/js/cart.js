@@ -0,0 +1,81 @@
+/*
+    Cart forms without page reloads.
+
+    A form with data-cart-api="<url>" is posted to that JSON endpoint
+    (see orders.views.cart_api_*) instead of being submitted, and the page
+    is updated from the response. Forms with data-cart-step="1" / "-1"
+    send their line's quantity plus the step. Without JavaScript, or if the
+    request fails, the form is submitted as usual.
+
+    Markup the response updates:
+      [data-cart-count]      number of items (header badge)
+      [data-cart-subtotal]   cart subtotal
+      [data-cart-line="id"]  one line; holds [data-line-quantity] and [data-line-subtotal]
+      [data-cart-message]    last message
+      [data-mini-cart]       marked stale, reloaded when the header cart opens
+*/
+(function ($) {
+    'use strict';
+
+    function updateLine($line, line) {
+        if (!line) {
+            $line.remove();
+            if (!$('[data-cart-line]').length) {
+                // Show the empty cart page
+                window.location.reload();
+            }
+            return;
+        }
+        $line.find('[data-line-quantity]').val(line.quantity);
+        $line.find('[data-line-subtotal]').text('$' + line.subtotal);
+        $line.find('[data-cart-step="-1"] button').prop('disabled', line.quantity <= 1).toggleClass('disabled', line.quantity <= 1);
+        $line.find('[data-cart-step="1"] button').prop('disabled', line.quantity >= line.stock).toggleClass('disabled', line.quantity >= line.stock);
+    }
+
+    function render($form, data) {
+        $('[data-cart-count]').text(data.cart.total_items);
+        $('[data-cart-subtotal]').text('$' + data.cart.subtotal);
+        $('[data-mini-cart]').attr('data-stale', 'true');
+        if (data.message) {
+            $('[data-cart-message]').text(data.message).removeClass('hide');
+        }
+        var $line = $form.closest('[data-cart-line]');
+        if ($line.length && 'line' in data) {
+            updateLine($line, data.line);
+        }
+    }
+
+    $(document).on('submit', 'form[data-cart-api]', function (e) {
+        var form = this;
+        var $form = $(form);
+        var fields = $form.serializeArray();
+        var step = $form.data('cart-step');
+        if (step !== undefined) {
+            var quantity = parseInt($form.closest('[data-cart-line]').find('[data-line-quantity]').val(), 10);
+            fields.push({ name: 'quantity', value: quantity + step });
+        }
+        e.preventDefault();
+
+        var $buttons = $form.find('button').prop('disabled', true);
+        $.ajax({ url: $form.data('cart-api'), type: 'POST', data: $.param(fields), dataType: 'json' })
+            .done(function (data) {
+                $buttons.prop('disabled', false);
+                render($form, data);
+            })
+            .fail(function (xhr) {
+                $buttons.prop('disabled', false);
+                var data = null;
+                try {
+                    data = $.parseJSON(xhr.responseText);
+                } catch (ignored) {}
+                if (data && data.cart) {
+                    render($form, data);
+                } else if (data && data.error) {
+                    $('[data-cart-message]').text(data.error).removeClass('hide');
+                } else {
+                    // Fall back to the page flow; submit() does not fire this handler again
+                    form.submit();
+                }
+            });
+    });
+})(jQuery);
@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.shortcuts import redirect, render
+from . import degrade, page_cache
 from .models import Category, Product, ProductImage, ProductDescription, ProductAdditionalInfo, ProductVariants, Review, SubCategory
 
 
@@ -17,10 +19,12 @@ class CategoryAdmin(admin.ModelAdmin):
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
+    readonly_fields = ['processing_status']
 
 class ProductDescriptionInline(admin.StackedInline):
     model = ProductDescription
     extra = 0
+    readonly_fields = ['processing_status']
     
 class ProductAdditionalInfoInline(admin.StackedInline):
     model = ProductAdditionalInfo
@@ -48,5 +52,25 @@ class ReviewAdmin(admin.ModelAdmin):
     actions = ['approve_reviews']
     
     def approve_reviews(self, request, queryset):
-        queryset.update(is_approved=True)
-    approve_reviews.short_description = "Approve selected reviews"
\ No newline at end of file
+        # Saved one by one, not update()d, so store.signals purges the
+        # cached pages of the reviewed products and moves updated_at
+        for review in queryset.filter(is_approved=False):
+            review.is_approved = True
+            review.save(update_fields=['is_approved', 'updated_at'])
+    approve_reviews.short_description = "Approve selected reviews"
+
+
+def page_cache_stats_view(request):
+    """Page cache hit rate and stale reads for staff, with a button to reset the counters"""
+    if request.method == 'POST':
+        page_cache.reset_stats()
+        degrade.reset_stats()
+        return redirect('page_cache_stats')
+
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Page cache',
+        'stats': page_cache.stats(),
+        'stale': degrade.stats(),
+    }
+    return render(request, 'admin/store/page_cache_stats.html', context)
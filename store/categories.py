@@ -0,0 +1,38 @@
+"""
+The category tree shown in every page's header menu.
+
+It is cached until a category or sub-category changes (see
+``store.signals``), with the last good copy served while a slow refresh
+runs (``store.degrade``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import degrade
+from .models import Category, SubCategory
+
+CACHE_KEY = 'store:category_tree'
+
+
+def _sub_categories(category_name):
+    return list(
+        SubCategory.objects.filter(is_active=True, category__name=category_name)
+        .select_related('category').order_by('name')
+    )
+
+
+def _fetch():
+    return {
+        'categories': list(Category.objects.filter(is_active=True).order_by('name')),
+        'mobile': _sub_categories('Mobile'),
+        'tablets': _sub_categories('Tablet'),
+    }
+
+
+def get_category_tree():
+    """Active categories, plus the Mobile and Tablet sub-categories for the menus."""
+    return degrade.read(CACHE_KEY, _fetch, settings.CATEGORY_TREE_CACHE_TIMEOUT)
+
+
+def invalidate_category_tree():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,102 @@
+"""
+ETag / Last-Modified validators for catalog pages.
+
+Each validator costs at most one aggregate query plus a cache read, so a
+revalidating client gets its 304 without the page being rendered. Pages
+are considered modified at the newest ``updated_at`` of the objects they
+show, or at the last catalog change if that is later: ``store.signals``
+bumps the catalog generation on any catalog change, which covers the
+rails and categories shown in every page's header.
+
+The ETag also covers the page's URL and the release (``RELEASE_ID``), so
+a deploy changing the markup invalidates what browsers hold. Validators
+are only produced for anonymous visitors; pages rendered for a
+signed-in user carry per-user content and are always sent in full.
+"""
+import hashlib
+
+from django.db.models import Max, Q
+from django.views.decorators.http import condition
+
+from ecommerce.release import release_id
+
+from . import generations
+from .models import Category, Product, SubCategory
+from .rails import cached_rails
+
+
+def catalog_changed_at():
+    """When the catalog last changed, or None if it never did"""
+    return generations.changed_at(generations.CATALOG)
+
+
+def _validators(compute):
+    """
+    Build the ``condition`` decorator for a view from ``compute``, which
+    returns the newest modification time of the objects on the page (or
+    None). It runs once per request even though both the ETag and the
+    Last-Modified callbacks need it.
+    """
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        if not hasattr(request, '_page_last_modified'):
+            request._page_last_modified = _newest(compute(request, *args, **kwargs), catalog_changed_at())
+        return request._page_last_modified
+
+    def etag(request, *args, **kwargs):
+        modified = last_modified(request, *args, **kwargs)
+        if modified is None:
+            return None
+        # Different for every page and every release, so a deploy with new
+        # markup is never answered with a 304
+        validator = f'{release_id()}:{request.get_full_path()}:{modified.isoformat()}'
+        return hashlib.md5(validator.encode()).hexdigest()
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _newest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _home_modified(request):
+    # Rails are normally cached, so this is a cache read; the catalog
+    # change time covers the category menu.
+    rails = cached_rails()
+    if rails is None:
+        return None
+    return _newest(*(product.updated_at for products in rails.values() for product in products))
+
+
+def _product_modified(request, slug):
+    result = Product.objects.filter(slug=slug, is_active=True).aggregate(
+        product=Max('updated_at'),
+        reviews=Max('reviews__updated_at', filter=Q(reviews__is_approved=True)),
+    )
+    return _newest(result['product'], result['reviews'])
+
+
+def _category_modified(request, slug):
+    result = Category.objects.filter(slug=slug, is_active=True).aggregate(
+        category=Max('updated_at'),
+        products=Max('products__updated_at', filter=Q(products__is_active=True)),
+    )
+    if result['category'] is None:
+        result = SubCategory.objects.filter(slug=slug, is_active=True).aggregate(
+            category=Max('updated_at'),
+            products=Max('products__updated_at', filter=Q(products__is_active=True)),
+        )
+    return _newest(result['category'], result['products'])
+
+
+def _listing_modified(request):
+    result = Product.objects.filter(is_active=True).aggregate(Max('updated_at'))
+    return result['updated_at__max']
+
+
+home_condition = _validators(_home_modified)
+product_condition = _validators(_product_modified)
+category_condition = _validators(_category_modified)
+listing_condition = _validators(_listing_modified)
@@ -0,0 +1,141 @@
+"""
+Stale-while-revalidate for catalog reads.
+
+Cached catalog data (rails, the category tree) keeps a last good copy
+after it stops being fresh. When a fresh copy is needed and a last good one
+exists, the loader runs on a background thread and the request waits at
+most ``CATALOG_READ_BUDGET`` seconds for it. A slow loader (e.g. SQLite
+locked by a long admin write) or a database error serves the last good copy
+instead; a slow loader keeps running and stores its result for the next
+request. With nothing to fall back on, the request waits for the loader
+like it always did.
+
+Anonymous pages keep a last good copy too, but a view uses the request and
+its session, so it is never run off-thread (see ``run_inline``): its
+catalog reads are bounded by the above, and a database error or another
+request already rendering the page serves the last good copy.
+
+Every stale answer is counted, see ``stats()``; like the page cache
+counters, per process with a process-local cache backend.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, connections
+
+logger = logging.getLogger(__name__)
+
+STALE_PREFIX = 'store:stale:'
+REFRESHING_PREFIX = 'store:stale:refreshing:'
+STATS_PREFIX = 'store:stale:stats:'
+# Why a stale copy was served
+STATS = ('slow', 'errors', 'refreshing')
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='catalog-refresh')
+
+
+def _count(stat):
+    key = STATS_PREFIX + stat
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def stats():
+    values = cache.get_many([STATS_PREFIX + stat for stat in STATS])
+    result = {stat: values.get(STATS_PREFIX + stat, 0) for stat in STATS}
+    result['stale'] = sum(result.values())
+    return result
+
+
+def reset_stats():
+    cache.delete_many([STATS_PREFIX + stat for stat in STATS])
+
+
+def _refresh(key, loader):
+    try:
+        return loader()
+    finally:
+        cache.delete(REFRESHING_PREFIX + key)
+        # This thread's connections are not closed by the request cycle
+        connections.close_all()
+
+
+def _claim(key):
+    """Whether this request may refresh ``key``; False while another one does."""
+    if cache.add(REFRESHING_PREFIX + key, True, settings.STALE_REFRESH_TIMEOUT):
+        return True
+    _count('refreshing')
+    return False
+
+
+def run_inline(key, loader, fallback):
+    """
+    Return ``loader()`` run on this thread, or ``fallback`` if it fails with
+    a database error or another request is already refreshing ``key``. For
+    loaders tied to the request, such as whole views; there is no read
+    budget, their own catalog reads have one.
+    """
+    if fallback is None or connection.in_atomic_block:
+        return loader()
+
+    if not _claim(key):
+        return fallback
+    try:
+        return loader()
+    except DatabaseError:
+        logger.exception('Catalog read %s failed, serving the last good copy', key)
+        _count('errors')
+        return fallback
+    finally:
+        cache.delete(REFRESHING_PREFIX + key)
+
+
+def run(key, loader, fallback):
+    """
+    Return ``loader()``, or ``fallback`` if the loader fails with a database
+    error or takes longer than the read budget. Only one refresh per ``key``
+    runs at a time; requests arriving meanwhile get the fallback right away.
+    ``loader`` should store its own result, since a slow one finishes after
+    the request that started it has been answered.
+    """
+    # Inside a transaction another thread could not see its uncommitted
+    # writes, so e.g. the signal handlers refreshing the rails load inline.
+    if fallback is None or connection.in_atomic_block:
+        return loader()
+
+    if not _claim(key):
+        return fallback
+
+    future = _executor.submit(_refresh, key, loader)
+    try:
+        return future.result(timeout=settings.CATALOG_READ_BUDGET)
+    except TimeoutError:
+        logger.warning('Catalog read %s over budget, serving the last good copy', key)
+        _count('slow')
+    except DatabaseError:
+        logger.exception('Catalog read %s failed, serving the last good copy', key)
+        _count('errors')
+    return fallback
+
+
+def read(key, loader, timeout):
+    """
+    Return ``loader()``, cached under ``key`` for ``timeout`` seconds and
+    kept as the last good copy for ``STALE_TIMEOUT`` seconds after that.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    def load():
+        value = loader()
+        cache.set(key, value, timeout)
+        cache.set(STALE_PREFIX + key, value, settings.STALE_TIMEOUT)
+        return value
+
+    return run(key, load, cache.get(STALE_PREFIX + key))
@@ -0,0 +1,116 @@
+"""
+Generation counters for invalidating per-process caches.
+
+Every gunicorn worker keeps its own copy of some catalog data (the rails,
+the page cache and the catalog change time when the cache backend is
+process-local). A write only reaches the worker that made it, so each
+change also bumps a named counter in the ``generations`` table.
+
+Workers read all counters at most once per request and no more often than
+every ``GENERATION_CHECK_INTERVAL`` seconds (``GenerationMiddleware`` does
+this at the start of each request). When a counter has moved since the last
+read, the handlers registered for it with ``on_change`` drop the stale local
+entries. The worker that bumped a counter has already invalidated what it
+needed to, so its own bumps do not trigger its handlers.
+
+``manage.py simulate_workers`` runs several processes against the same
+database to check that a bump reaches all of them.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Generation
+
+CATALOG = 'catalog'
+
+_lock = threading.Lock()
+_seen = {}  # name -> (value, updated_at) as of the last read
+_checked_at = None
+_handlers = {}
+
+
+def on_change(name):
+    """Register a handler to run when another process bumps ``name``."""
+    def register(func):
+        _handlers.setdefault(name, []).append(func)
+        return func
+    return register
+
+
+def cache_is_local():
+    """Whether the default cache lives in this process, and so needs handlers to stay fresh."""
+    return isinstance(caches['default'], LocMemCache)
+
+
+def _load(names=None):
+    rows = Generation.objects.all() if names is None else Generation.objects.filter(name__in=names)
+    return {name: (value, updated_at) for name, value, updated_at in rows.values_list('name', 'value', 'updated_at')}
+
+
+def _apply(current, own=()):
+    """Record ``current`` and run the handlers of counters moved by someone else."""
+    stale = []
+    with _lock:
+        first = _checked_at is None
+        for name, (value, updated_at) in current.items():
+            seen = _seen.get(name, (0, None))[0]
+            if not first and value != seen + (name in own):
+                stale.append(name)
+            _seen[name] = (value, updated_at)
+    for name in stale:
+        for handler in _handlers.get(name, ()):
+            handler()
+
+
+def sync(force=False):
+    """Read every counter unless that was done less than the check interval ago."""
+    global _checked_at
+    now = time.monotonic()
+    if not force and _checked_at is not None and now - _checked_at < settings.GENERATION_CHECK_INTERVAL:
+        return
+    _apply(_load())
+    _checked_at = now
+
+
+def bump(*names):
+    """Record that the data behind ``names`` changed."""
+    now = timezone.now()
+    for name in names:
+        if Generation.objects.filter(name=name).update(value=F('value') + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                Generation.objects.create(name=name, value=1)
+        except IntegrityError:
+            # Created by another process in the meantime
+            Generation.objects.filter(name=name).update(value=F('value') + 1, updated_at=now)
+    _apply(_load(names), own=names)
+
+
+def value(name):
+    sync()
+    return _seen.get(name, (0, None))[0]
+
+
+def changed_at(name):
+    """When ``name`` was last bumped, or None if it never was."""
+    sync()
+    return _seen.get(name, (0, None))[1]
+
+
+class GenerationMiddleware:
+    """Pick up counters bumped by other processes before handling a request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sync()
+        return self.get_response(request)
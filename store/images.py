@@ -0,0 +1,236 @@
+"""
+Responsive derivatives of uploaded product images.
+
+Every ``ProductImage`` and ``ProductDescription`` image gets resized copies
+at ``IMAGE_DERIVATIVE_WIDTHS``, in WebP and JPEG, stored next to the
+original: ``products/gallery/iphone.jpg`` gets ``iphone.320w.webp``,
+``iphone.320w.jpg`` and so on. Widths above the original's are replaced
+by one copy at the original's own width. The widths that were made are stored
+on the row, so templates build ``srcset`` without touching the files (see
+the ``{% picture %}`` tag in ``store.templatetags.responsive``). So are the
+size of the image as displayed, for ``width``/``height`` attributes, and a
+placeholder: a ``IMAGE_PLACEHOLDER_WIDTH`` px wide blurred WebP as a
+``data:`` URI (a few hundred bytes), inlined while the image loads.
+
+Decoding, resizing and re-encoding run in a process pool, off the request
+that uploaded the image. The row's ``processing_status`` says whether the
+derivatives exist yet; until they do, templates serve the original.
+"""
+import base64
+import logging
+import multiprocessing
+import posixpath
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache, partial
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import ExifTags, Image, ImageFilter, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Values of the ``processing_status`` field of image rows
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+STATUS_CHOICES = [(PENDING, 'Pending'), (READY, 'Ready'), (FAILED, 'Failed')]
+
+# Extension -> (Pillow format, MIME type, save options). Saving without
+# an ``exif`` argument also drops the original's metadata.
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def derivative_name(name, width, extension):
+    root, _ = posixpath.splitext(name)
+    return f'{root}.{width}w.{extension}'
+
+
+def derivative_names(name, widths):
+    return [derivative_name(name, width, extension) for width in widths for extension in FORMATS]
+
+
+def srcset(image, extension):
+    """
+    The ``srcset`` listing the ``extension`` derivatives of ``image`` (a
+    ``ProductImage`` or ``ProductDescription``), or '' while there are none.
+    """
+    widths = image.derivative_widths
+    if image.processing_status != READY or not widths:
+        return ''
+    url = image.image.storage.url
+    return ', '.join(f'{url(derivative_name(image.image.name, width, extension))} {width}w' for width in widths)
+
+
+# Matches derivative names; group 1 is the original's name without its extension
+DERIVATIVE_NAME = re.compile(rf'^(.*)\.\d+w\.(?:{"|".join(FORMATS)})$')
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    if _has_alpha(image):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def displayed_size(image):
+    """(width, height) of an opened image once its EXIF orientation is applied, from the header alone."""
+    # Orientations 5-8 are rotated a quarter turn
+    if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+        return image.height, image.width
+    return image.width, image.height
+
+
+def placeholder(image):
+    """
+    A tiny blurred copy of ``image`` as a ``data:`` URI. Empty for
+    transparent images, whose placeholder would show through them.
+    """
+    if _has_alpha(image):
+        return ''
+    small = image.convert('RGB')
+    small.thumbnail((settings.IMAGE_PLACEHOLDER_WIDTH, image.height), Image.Resampling.BOX)
+    buffer = BytesIO()
+    small.filter(ImageFilter.GaussianBlur(1)).save(buffer, 'WEBP', quality=40)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def _widths(image_width):
+    widths = [width for width in settings.IMAGE_DERIVATIVE_WIDTHS if width < image_width]
+    if image_width <= max(settings.IMAGE_DERIVATIVE_WIDTHS):
+        # Re-encoded at full size, so the srcset has a candidate as sharp as the original
+        widths.append(image_width)
+    return widths
+
+
+def generate(name, force=False):
+    """
+    Write the derivatives of the stored image ``name`` and return the
+    fields to store on its row: the widths made, the displayed size and the
+    placeholder. Runs in the processing pool, so it only touches files.
+
+    Uploads are content-addressed, so rows with the same picture share one
+    name; unless ``force`` is set, derivatives that already exist are reused
+    and only the placeholder is made.
+    """
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        # Only the header is read so far
+        width, height = displayed_size(image)
+        widths = _widths(width)
+        fields = {'derivative_widths': widths, 'width': width, 'height': height}
+        reuse = not force and all(default_storage.exists(derivative) for derivative in derivative_names(name, widths))
+        if reuse:
+            # Decode JPEGs at a fraction of their size, enough for the placeholder
+            image.draft(None, (settings.IMAGE_PLACEHOLDER_WIDTH * 8,) * 2)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    fields['placeholder'] = placeholder(image)
+    if reuse:
+        return fields
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for extension, (format, _, options) in FORMATS.items():
+            buffer = BytesIO()
+            (resized if format == 'WEBP' else _flatten(resized)).save(buffer, format, **options)
+            derivative = derivative_name(name, width, extension)
+            # Replace rather than let the storage pick a new name
+            default_storage.delete(derivative)
+            default_storage.save(derivative, ContentFile(buffer.getvalue()))
+    return fields
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def new_pool(workers):
+    """A pool of ``workers`` processes, each a fully set-up Django interpreter."""
+    # Spawned rather than forked: the parent may be running threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker)
+
+
+@cache
+def pool():
+    """
+    This process's upload pool, started on first use. Every gunicorn worker
+    gets its own, hence the small ``IMAGE_PROCESSING_WORKERS``.
+    """
+    return new_pool(settings.IMAGE_PROCESSING_WORKERS)
+
+
+def record(model, pk, name, fields=None):
+    """
+    Store the outcome of processing ``name`` on the row, unless the row got
+    a different image meanwhile. ``fields`` is what ``generate`` returned,
+    None if processing failed. Saved through the model so the catalog
+    signals see the change.
+    """
+    instance = model.objects.filter(pk=pk, image=name).first()
+    if instance is None:
+        return
+    if fields is None:
+        instance.processing_status = FAILED
+        instance.save(update_fields=['processing_status'])
+        return
+    for field, value in fields.items():
+        setattr(instance, field, value)
+    instance.processing_status = READY
+    instance.save(update_fields=[*fields, 'processing_status'])
+
+
+def _outcome(name, result):
+    """``result()``, the fields ``generate`` returned, or None after logging its error."""
+    try:
+        return result()
+    except Exception:
+        logger.exception('Processing %s failed, serving the original', name)
+        return None
+
+
+def _finished(model, pk, name, future):
+    # Runs on the pool's result thread, which has its own DB connection
+    try:
+        record(model, pk, name, _outcome(name, future.result))
+    finally:
+        connections.close_all()
+
+
+def schedule(instance):
+    """
+    Process ``instance.image`` in the pool once the upload is committed.
+    Until then, and if processing fails, templates serve the original.
+    """
+    model, pk, name = type(instance), instance.pk, instance.image.name
+
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS == 0:
+            record(model, pk, name, _outcome(name, partial(generate, name)))
+            return
+        try:
+            future = pool().submit(generate, name)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            pool.cache_clear()
+            future = pool().submit(generate, name)
+        future.add_done_callback(partial(_finished, model, pk, name))
+
+    transaction.on_commit(submit)
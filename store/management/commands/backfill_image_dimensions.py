@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from store import images
+from store.models import ProductDescription, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Store the displayed width and height of product and description images uploaded before they were recorded'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows read from the database at a time')
+
+    def handle(self, *args, **options):
+        for model in (ProductImage, ProductDescription):
+            rows = (
+                model.objects.exclude(image='').exclude(image__isnull=True)
+                .filter(width__isnull=True)
+                .only('pk', 'product_id', 'image', 'width', 'height')
+            )
+            done = failed = 0
+            for instance in rows.iterator(chunk_size=options['batch_size']):
+                try:
+                    with instance.image.open('rb'):
+                        # Image.open only reads the header
+                        instance.width, instance.height = images.displayed_size(Image.open(instance.image))
+                except OSError as e:  # Missing or not an image
+                    failed += 1
+                    self.stderr.write(f'{model.__name__} {instance.pk} ({instance.image.name}): {e}')
+                    continue
+                # Saved through the model so the cached cards and pages pick up the dimensions
+                instance.save(update_fields=['width', 'height'])
+                done += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {done} updated, {failed} failed')
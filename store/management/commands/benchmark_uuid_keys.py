@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.ids import uuid7, uuid7_floor
+
+
+class Command(BaseCommand):
+    help = 'Compare uuid4 and uuid7 primary keys for inserts, index size and recent-row range scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000, help='Rows to insert per key type')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--recent', type=float, default=0.01,
+                            help='Fraction of the newest rows fetched by the range scan')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        self.stdout.write(f'Inserting {rows:,} rows per key type into a products-shaped table...')
+
+        results = {}
+        for label, factory in (('uuid4', uuid.uuid4), ('uuid7', uuid7)):
+            results[label] = self.run(factory, rows, options['batch_size'], options['recent'])
+
+        self.stdout.write('')
+        self.stdout.write(f'{"":<8}{"insert s":>10}{"rows/s":>12}{"db MiB":>10}{"scan ms":>10}{"scan plan":>14}')
+        for label, result in results.items():
+            self.stdout.write(
+                f'{label:<8}{result["insert"]:>10.2f}{rows / result["insert"]:>12,.0f}'
+                f'{result["size"] / 2**20:>10.1f}{result["scan"] * 1000:>10.1f}{result["plan"]:>14}'
+            )
+
+        speedup = results['uuid4']['insert'] / results['uuid7']['insert']
+        self.stdout.write(self.style.SUCCESS(f'uuid7 inserts ran {speedup:.2f}x the speed of uuid4'))
+
+    def run(self, factory, rows, batch_size, recent):
+        # A file-backed database with a small page cache, so that random
+        # index writes actually cost page reads and writes like they would
+        # on a production-sized table.
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            db = sqlite3.connect(path)
+            db.execute('PRAGMA cache_size = -2000')
+            # Same layout Django uses for a UUIDField primary key on SQLite
+            db.execute('CREATE TABLE bench (id char(32) NOT NULL PRIMARY KEY, '
+                       'created_at datetime NOT NULL, name varchar(255) NOT NULL)')
+
+            started = time.perf_counter()
+            start_ts = time.time()
+            for offset in range(0, rows, batch_size):
+                count = min(batch_size, rows - offset)
+                now = time.time()
+                db.executemany(
+                    'INSERT INTO bench (id, created_at, name) VALUES (?, ?, ?)',
+                    ((factory().hex, now, f'product {offset + i}') for i in range(count)),
+                )
+                db.commit()
+            insert_time = time.perf_counter() - started
+            end_ts = time.time()
+
+            # Newest rows: uuid7 keys can be bounded by time on the primary
+            # key index itself, uuid4 keys need the created_at column.
+            since = end_ts - (end_ts - start_ts) * recent
+            if factory is uuid7:
+                sql, params = 'SELECT id, name FROM bench WHERE id >= ? ORDER BY id DESC', [uuid7_floor(since).hex]
+            else:
+                sql, params = 'SELECT id, name FROM bench WHERE created_at >= ? ORDER BY created_at DESC', [since]
+            plan = ' '.join(row[-1] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+            started = time.perf_counter()
+            db.execute(sql, params).fetchall()
+            scan_time = time.perf_counter() - started
+            db.close()
+
+            return {
+                'insert': insert_time,
+                'size': os.path.getsize(path),
+                'scan': scan_time,
+                'plan': 'index' if 'INDEX' in plan else 'full scan',
+            }
+        finally:
+            os.remove(path)
@@ -0,0 +1,70 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from orders.models import Cart, Order
+from store.models import Category, Product, Review
+
+
+def hot_queries():
+    """
+    The storefront's hottest queries, each as (label, queryset).
+
+    Placeholder values are fine here: the planner's choice of index depends
+    on the shape of the query, not on whether any row matches.
+    """
+    category = Category(pk='00000000-0000-0000-0000-000000000000')
+    product = Product(pk='00000000-0000-0000-0000-000000000000')
+    active = Product.objects.filter(is_active=True)
+
+    return [
+        ('latest products', active.order_by('-created_at')[:5]),
+        ('featured products', active.filter(is_featured=True).order_by('-created_at')[:5]),
+        ('promoted products', active.filter(is_promoted=True).order_by('-created_at')[:5]),
+        ('slider products', active.filter(is_slider=True).order_by('-created_at')),
+        ('category listing by price', active.filter(category=category).order_by('price')[:12]),
+        ('category listing by recency', active.filter(category=category).order_by('-created_at')[:12]),
+        ('approved reviews', Review.objects.filter(product=product, is_approved=True).order_by('-created_at')),
+        ('user orders', Order.objects.filter(user_id='00000000-0000-0000-0000-000000000000').order_by('-created_at')),
+        ('order by payment intent', Order.objects.filter(stripe_payment_intent='pi_placeholder')),
+        ('session cart', Cart.objects.filter(session_key='placeholder')),
+    ]
+
+
+# Plan lines that mean a table is read front to back.
+FULL_SCAN_PATTERNS = {
+    # SQLite reports "SCAN products" for a table scan and
+    # "SCAN products USING [COVERING] INDEX ..." for an index walk.
+    'sqlite': re.compile(r'\bSCAN (?!.*\bUSING\b.*\bINDEX\b)\S+'),
+    'postgresql': re.compile(r'\bSeq Scan on\b'),
+    'mysql': re.compile(r"\btype\W+ALL\b"),
+}
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the storefront hot queries and fail if any falls back to a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+
+    def handle(self, *args, **options):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}.')
+
+        failures = []
+        for label, queryset in hot_queries():
+            plan = queryset.explain()
+            scans = [line.strip() for line in plan.splitlines() if pattern.search(line)]
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}: {"; ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok         {label}'))
+            if options['verbose_plans']:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot quer{"y" if len(failures) == 1 else "ies"} '
+                               f'fell back to a full scan: {", ".join(failures)}')
@@ -0,0 +1,99 @@
+import os
+import posixpath
+import time
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import FileField, Q
+
+from store.images import DERIVATIVE_NAME
+
+
+def file_fields():
+    """Every (model, field name) that stores a file name in the database."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, FileField)
+    ]
+
+
+def walk(root, cutoff):
+    """
+    Yield (name relative to ``root``, size) for every file last modified
+    before ``cutoff``. Only the directories still to visit are kept in
+    memory, never the list of files.
+    """
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_mtime < cutoff:
+                        yield os.path.relpath(entry.path, root).replace(os.sep, '/'), stat.st_size
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Report, or with --delete remove, media files that no database row references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete', action='store_true', help='Delete the orphaned files (default: report only)')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Leave files younger than this alone, e.g. uploads whose row is not saved yet')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Files checked against the database per query')
+
+    def handle(self, *args, **options):
+        fields = file_fields()
+        cutoff = time.time() - options['grace_hours'] * 3600
+        scanned = orphans = freed = 0
+
+        for batch in batches(walk(settings.MEDIA_ROOT, cutoff), options['batch_size']):
+            scanned += len(batch)
+            for name, size in self.orphans(batch, fields):
+                orphans += 1
+                freed += size
+                if options['verbosity'] > 1:
+                    self.stdout.write(name)
+                if options['delete']:
+                    os.remove(os.path.join(settings.MEDIA_ROOT, name))
+
+        action = 'Deleted' if options['delete'] else 'Found'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {orphans:,} orphaned files ({freed / 2**20:,.1f} MiB) out of {scanned:,} checked'
+        ))
+
+    def orphans(self, batch, fields):
+        """The files of ``batch`` that no row references, directly or as a derivative of its image."""
+        names = [name for name, _ in batch]
+        roots = {name: match.group(1) for name in names if (match := DERIVATIVE_NAME.match(name))}
+
+        referenced, live_roots = set(), set()
+        for model, field in fields:
+            manager = model._default_manager
+            referenced.update(manager.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+            if roots:
+                # Originals of the derivatives in this batch, whatever their extension
+                matches = reduce(or_, (Q(**{f'{field}__startswith': f'{root}.'}) for root in set(roots.values())))
+                live_roots.update(
+                    posixpath.splitext(value)[0] for value in manager.filter(matches).values_list(field, flat=True)
+                )
+
+        for name, size in batch:
+            if name not in referenced and roots.get(name) not in live_roots:
+                yield name, size
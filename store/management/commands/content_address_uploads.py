@@ -0,0 +1,73 @@
+import hashlib
+import os
+import re
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Account
+from store import images
+from store.models import ProductDescription, ProductImage
+
+# upload_to/ab/<sha256>.ext
+CONTENT_ADDRESSED = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = 'Move uploads stored before content addressing to their content-hash names, merging duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would move')
+
+    def handle(self, *args, **options):
+        for model, field in ((ProductImage, 'image'), (ProductDescription, 'image'), (Account, 'avatar')):
+            storage = model._meta.get_field(field).storage
+            moved, names = 0, set()
+            # Saved through the model below, so the catalog signals drop the
+            # cached pages and cards that show the old name
+            saved_fields = [field, *(['updated_at'] if hasattr(model, 'updated_at') else [])]
+            if model is not Account:
+                saved_fields += ['derivative_widths', 'processing_status']
+            rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for instance in rows.iterator(chunk_size=500):
+                pk, name = instance.pk, getattr(instance, field).name
+                if CONTENT_ADDRESSED.search(name):
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write(f'{model.__name__} {pk}: {name} is missing')
+                    continue
+                if options['dry_run']:
+                    with storage.open(name, 'rb') as f:
+                        digest = hashlib.sha256()
+                        for chunk in f.chunks():
+                            digest.update(chunk)
+                    new_name = digest.hexdigest()
+                else:
+                    with storage.open(name, 'rb') as f:
+                        new_name = storage.save(name, f)
+                    old_files = [name]
+                    setattr(instance, field, new_name)
+                    if model is not Account:
+                        # Derivatives are named after the original
+                        old_files += images.derivative_names(name, instance.derivative_widths)
+                        instance.derivative_widths = []
+                        instance.processing_status = images.PENDING
+                    instance.save(update_fields=saved_fields)
+                    # Pages cached elsewhere (browsers, CDNs, last good copies)
+                    # may still show the old files; restart their grace period
+                    # in collect_media_garbage
+                    for old in old_files:
+                        try:
+                            os.utime(storage.path(old))
+                        except FileNotFoundError:
+                            pass
+                moved += 1
+                names.add(new_name)
+
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {moved} moved into {len(names)} files')
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                'Done. Run generate_image_derivatives for the moved images. The old files are kept by '
+                'collect_media_garbage for its --grace-hours (default 24) from now, while cached pages may '
+                'still show them; it removes them after that.'
+            ))
@@ -0,0 +1,58 @@
+import os
+import time
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from store import images
+from store.models import ProductDescription, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Create the resized WebP/JPEG copies of existing product and description images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate images that already have derivatives')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Images queued on the pool at a time')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes resizing images (default: one per CPU)')
+
+    def handle(self, *args, **options):
+        # Keep every process of the pool busy, but hold at most one batch of
+        # rows and futures in memory.
+        pool = images.new_pool(options['workers'])
+        started = time.perf_counter()
+        total = 0
+        for model in (ProductImage, ProductDescription):
+            queryset = model.objects.exclude(image='').exclude(image__isnull=True)
+            if not options['force']:
+                # Rows processed before placeholders existed only need those;
+                # their derivatives are reused
+                queryset = queryset.filter(~Q(processing_status=images.READY) | Q(placeholder=''))
+
+            done = failed = 0
+            rows = queryset.values_list('pk', 'image').iterator(chunk_size=options['batch_size'])
+            while batch := [row for _, row in zip(range(options['batch_size']), rows)]:
+                futures = {pool.submit(images.generate, name, options['force']): (pk, name) for pk, name in batch}
+                for future in as_completed(futures):
+                    pk, name = futures[future]
+                    try:
+                        fields = future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f'{model.__name__} {pk} ({name}): {e}')
+                        fields = None
+                    else:
+                        done += 1
+                    images.record(model, pk, name, fields)
+            total += done
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {done} processed, {failed} failed')
+
+        pool.shutdown()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {total} images in {elapsed:.1f}s with {options['workers']} processes'
+        ))
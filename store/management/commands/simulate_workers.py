@@ -0,0 +1,84 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def worker(index, ready, go, results, timeout):
+    """
+    One simulated gunicorn worker: warm this process's rails cache, wait for
+    the bump, then keep syncing like the middleware would until the catalog
+    handler has dropped the cached rails.
+    """
+    import django
+    django.setup()
+    from django.db import connection
+    from store import generations, rails
+
+    generations.sync(force=True)
+    rails.get_rails()
+    seen = generations.value(generations.CATALOG)
+    ready.put(index)
+    go.wait()
+
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        generations.sync()
+        if generations.value(generations.CATALOG) > seen:
+            results.put((index, time.monotonic() - started, rails.cached_rails() is None))
+            break
+        time.sleep(0.05)
+    else:
+        results.put((index, None, rails.cached_rails() is None))
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Run several worker processes and check that a catalog bump invalidates all of their local caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help='Seconds a worker waits to see the bump')
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+        from django.db import connection
+        from store import generations
+
+        workers = options['workers']
+        # Spawned, not forked: each worker starts with its own empty
+        # process-local cache, like a freshly booted gunicorn worker.
+        context = multiprocessing.get_context('spawn')
+        ready, results, go = context.Queue(), context.Queue(), context.Event()
+        connection.close()
+        processes = [
+            context.Process(target=worker, args=(index, ready, go, results, options['timeout']))
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get(timeout=options['timeout'] * 3)
+
+        self.stdout.write(f'{workers} workers warmed up, bumping the catalog generation...')
+        generations.bump(generations.CATALOG)
+        go.set()
+
+        failed = []
+        for _ in processes:
+            index, elapsed, dropped = results.get(timeout=options['timeout'] * 2)
+            if elapsed is None or not dropped:
+                failed.append(index)
+                self.stdout.write(self.style.ERROR(f'worker {index}: still serving stale rails'))
+            else:
+                self.stdout.write(f'worker {index}: invalidated after {elapsed * 1000:.0f} ms')
+        for process in processes:
+            process.join()
+
+        if failed:
+            raise CommandError(f'{len(failed)} of {workers} workers kept stale data')
+        self.stdout.write(self.style.SUCCESS(
+            f'All {workers} workers picked up the change '
+            f'(check interval {settings.GENERATION_CHECK_INTERVAL}s)'
+        ))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:36
+
+import ecommerce.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_uuid7_primary_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Generation',
+            fields=[
+                ('id', models.UUIDField(default=ecommerce.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Generation',
+                'verbose_name_plural': 'Generations',
+                'db_table': 'generations',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_generations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productdescription',
+            name='derivative_widths',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Widths of the resized copies of the image'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='derivative_widths',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Widths of the resized copies of the image'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:42
+
+from django.db import migrations, models
+
+
+def mark_processed_ready(apps, schema_editor):
+    # Rows backfilled before the status existed already have their derivatives
+    for model_name in ('ProductImage', 'ProductDescription'):
+        model = apps.get_model('store', model_name)
+        model.objects.exclude(derivative_widths=[]).update(processing_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productdescription',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, help_text='Whether the resized copies exist yet', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, help_text='Whether the resized copies exist yet', max_length=20),
+        ),
+        migrations.RunPython(mark_processed_ready, migrations.RunPython.noop),
+    ]
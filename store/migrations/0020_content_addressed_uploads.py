@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:44
+
+import ecommerce.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_image_processing_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productdescription',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=ecommerce.storage.ContentAddressedStorage(), upload_to='products/descriptions/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=ecommerce.storage.ContentAddressedStorage(), upload_to='products/gallery/'),
+        ),
+    ]
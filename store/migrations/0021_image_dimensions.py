@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_content_addressed_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productdescription',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Height of the image as displayed, in pixels', null=True),
+        ),
+        migrations.AddField(
+            model_name='productdescription',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Width of the image as displayed, in pixels', null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Height of the image as displayed, in pixels', null=True),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Width of the image as displayed, in pixels', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productdescription',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny blurred copy of the image as a data: URI, shown while it loads'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Tiny blurred copy of the image as a data: URI, shown while it loads'),
+        ),
+    ]
@@ -1,12 +1,14 @@
 from django.db import models
 from django.utils.text import slugify
 from django.urls import reverse
-import uuid
+from ecommerce.ids import uuid7
+from ecommerce.storage import upload_storage
+from . import images
 
 
 class Category(models.Model):
     """Product categories"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=255, unique=True)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     is_active = models.BooleanField(default=True)
@@ -33,7 +35,7 @@ class Category(models.Model):
 
 class SubCategory(models.Model):
     """Product sub-categories"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='subcategories')
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
@@ -61,7 +63,7 @@ class SubCategory(models.Model):
 
 class Product(models.Model):
     """Product model"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     sku = models.CharField(max_length=100, unique=True, blank=True, null=True, help_text='Product SKU/Code')
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
@@ -90,6 +92,21 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        indexes = [
+            # Homepage rails: active products (optionally flagged) newest first
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True),
+                         name='products_active_recent_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True, is_featured=True),
+                         name='products_featured_recent_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True, is_promoted=True),
+                         name='products_promoted_recent_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_active=True, is_slider=True),
+                         name='products_slider_recent_idx'),
+            # Category listings filtered and sorted by price or recency
+            models.Index(fields=['category', 'is_active', 'price'], name='products_cat_active_price_idx'),
+            models.Index(fields=['category', '-created_at'], condition=models.Q(is_active=True),
+                         name='products_cat_recent_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -126,11 +143,43 @@ class Product(models.Model):
         """Get total count of approved reviews"""
         return self.reviews.filter(is_approved=True).count()
     
-class ProductDescription(models.Model):
+
+class ProcessedImage(models.Model):
+    """
+    An ``image`` with resized copies, dimensions and a placeholder made in
+    the background after each upload (see store.images)
+    """
+    derivative_widths = models.JSONField(default=list, blank=True, editable=False,
+                                         help_text='Widths of the resized copies of the image')
+    processing_status = models.CharField(max_length=20, choices=images.STATUS_CHOICES, default=images.PENDING,
+                                         editable=False, help_text='Whether the resized copies exist yet')
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False,
+                                        help_text='Width of the image as displayed, in pixels')
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False,
+                                         help_text='Height of the image as displayed, in pixels')
+    placeholder = models.TextField(blank=True, editable=False,
+                                   help_text='Tiny blurred copy of the image as a data: URI, shown while it loads')
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        uploaded = bool(self.image) and not self.image._committed
+        if uploaded:
+            self.derivative_widths = []
+            self.width = self.height = None
+            self.placeholder = ''
+            self.processing_status = images.PENDING
+        super().save(*args, **kwargs)
+        if uploaded:
+            images.schedule(self)
+
+
+class ProductDescription(ProcessedImage):
     """Detailed product description"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='descriptions')
-    image = models.ImageField(upload_to='products/descriptions/', blank=True, null=True)
+    image = models.ImageField(upload_to='products/descriptions/', storage=upload_storage, blank=True, null=True)
     title = models.CharField(max_length=255, blank=True)
     content = models.TextField(help_text='Detailed HTML description of the product')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -145,11 +194,11 @@ class ProductDescription(models.Model):
         return f"Product Description {self.id}"
 
 
-class ProductImage(models.Model):
+class ProductImage(ProcessedImage):
     """Additional product images"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
-    image = models.ImageField(upload_to='products/gallery/')
+    image = models.ImageField(upload_to='products/gallery/', storage=upload_storage)
     alt_text = models.CharField(max_length=255, blank=True)
     is_thumbnail = models.BooleanField(default=False, help_text='Display in thumbnail gallery')
     display_order = models.IntegerField(default=0, help_text='Order in which images are displayed')
@@ -167,7 +216,7 @@ class ProductImage(models.Model):
 
 class Review(models.Model):
     """Product reviews"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey('accounts.Account', on_delete=models.CASCADE)
     rating = models.FloatField(choices=[(i, i) for i in range(1, 6)])
@@ -185,6 +234,9 @@ class Review(models.Model):
         verbose_name_plural = 'Reviews'
         ordering = ['-created_at']
         unique_together = ('product', 'user')
+        indexes = [
+            models.Index(fields=['product', 'is_approved', '-created_at'], name='reviews_product_approved_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.user.username} - {self.rating} stars"
@@ -192,7 +244,7 @@ class Review(models.Model):
 
 class ProductVariants(models.Model):
     """Product variants like size, color"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
     variant_type = models.CharField(max_length=100, help_text='Type of variant (e.g., Size, Color)')
     variant_value = models.CharField(max_length=100, help_text='Value of the variant (e.g., Red, Large)')
@@ -214,7 +266,7 @@ class ProductVariants(models.Model):
     
 class ProductAdditionalInfo(models.Model):
     """Additional information about the product"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='additional_info')
     variant_name = models.CharField(max_length=100, blank=True, null=True, 
                                    help_text='Variant/Model name (e.g., iPhone 6s, iPhone 6s Plus)')
@@ -232,4 +284,19 @@ class ProductAdditionalInfo(models.Model):
     def __str__(self):
         if self.variant_name:
             return f"{self.product.name} - {self.key} ({self.variant_name})"
-        return f"{self.product.name} - {self.key}"
\ No newline at end of file
+        return f"{self.product.name} - {self.key}"
+
+class Generation(models.Model):
+    """Named counter bumped whenever the data behind a cache changes (see store.generations)"""
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
+    name = models.CharField(max_length=100, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'generations'
+        verbose_name = 'Generation'
+        verbose_name_plural = 'Generations'
+
+    def __str__(self):
+        return f"{self.name} #{self.value}"
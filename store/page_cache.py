@@ -0,0 +1,170 @@
+"""
+Full-page cache for anonymous storefront GETs.
+
+Pages are keyed by release, host, path and query string. While a view runs, the code
+that loads catalog data tags the request with what it displayed
+(``product:<id>``, ``category:<id>``, ``rail:<name>``, ``categories``). The
+cached entry remembers the version of each of its tags; ``purge()`` gives a
+tag a new version, which turns every page carrying it into a miss without
+having to know which pages those are. Every page also carries
+``CATALOG_TAG``, for dropping all of them at once.
+
+Only responses that are the same for every anonymous visitor are stored:
+200s without cookies and without a CSRF token rendered into them. A page
+that is no longer fresh is still served, marked ``stale``, when rendering
+it again fails or another request is already doing so (see
+``store.degrade``).
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from ecommerce.release import release_id
+
+from . import degrade, generations
+
+PAGE_PREFIX = 'store:page_cache:page:'
+TAG_PREFIX = 'store:page_cache:tag:'
+STATS_PREFIX = 'store:page_cache:stats:'
+STATS = ('hits', 'misses', 'stores', 'purges')
+CATALOG_TAG = 'catalog'
+
+
+def product_tag(product):
+    return f'product:{getattr(product, "pk", product)}'
+
+
+def category_tag(category):
+    return f'category:{getattr(category, "pk", category)}'
+
+
+def tag(request, *tags):
+    """Record that the page being rendered for ``request`` shows ``tags``."""
+    request.__dict__.setdefault('_page_cache_tags', set()).update(tags)
+
+
+def tag_products(request, products):
+    tag(request, *(product_tag(product) for product in products))
+
+
+def purge(*tags):
+    """Invalidate every cached page carrying any of ``tags``."""
+    if tags:
+        cache.set_many({TAG_PREFIX + name: uuid.uuid4().hex for name in tags}, None)
+        _count('purges', len(tags))
+
+
+def _tag_versions(tags):
+    keys = [TAG_PREFIX + name for name in tags]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {name: versions[TAG_PREFIX + name] for name in tags}
+
+
+def _page_key(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    # Pages rendered by a previous release are never served
+    url = f'{release_id()}:{request.get_host()}{request.path}?{query}'
+    return PAGE_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+
+def _count(stat, amount=1):
+    key = STATS_PREFIX + stat
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, None)
+
+
+def stats():
+    """
+    Counters since the last reset. They live in the default cache, so with
+    a process-local backend (the default LocMemCache) they cover only the
+    worker answering the stats page, not the site; ``local`` says so.
+    """
+    values = cache.get_many([STATS_PREFIX + stat for stat in STATS])
+    result = {stat: values.get(STATS_PREFIX + stat, 0) for stat in STATS}
+    lookups = result['hits'] + result['misses']
+    result['hit_rate'] = result['hits'] / lookups * 100 if lookups else 0
+    result['local'] = generations.cache_is_local()
+    return result
+
+
+def reset_stats():
+    cache.delete_many([STATS_PREFIX + stat for stat in STATS])
+
+
+def _is_cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _is_fresh(entry):
+    if time.time() > entry['expires']:
+        return False
+    tags = entry['tags']
+    current = cache.get_many([TAG_PREFIX + name for name in tags])
+    return all(current.get(TAG_PREFIX + name) == version for name, version in tags.items())
+
+
+def _store(request, response):
+    entry = {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': dict(response.headers),
+        'tags': _tag_versions(sorted({CATALOG_TAG, *request.__dict__.get('_page_cache_tags', ())})),
+        'expires': time.time() + settings.PAGE_CACHE_TIMEOUT,
+    }
+    # Kept past its expiry and purges as the last good copy (see store.degrade)
+    cache.set(_page_key(request), entry, settings.STALE_TIMEOUT)
+    _count('stores')
+
+
+def _response(entry, state):
+    response = HttpResponse(entry['content'], status=entry['status'], headers=entry['headers'])
+    response['X-Page-Cache'] = state
+    return response
+
+
+def cache_page_for_anonymous(view_func):
+    """Serve ``view_func`` from the page cache for anonymous GET and HEAD requests."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        key = _page_key(request)
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry):
+            _count('hits')
+            return _response(entry, 'hit')
+
+        _count('misses')
+
+        def render():
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable(request, response):
+                _store(request, response)
+            return response
+
+        response = degrade.run_inline(key, render, entry)
+        if response is entry:
+            return _response(entry, 'stale')
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    return wrapper
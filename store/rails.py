@@ -0,0 +1,120 @@
+"""
+Homepage product rails.
+
+A rail is a short list of active products picked by a filter and an
+ordering, such as "featured, newest first, 5 items". Every rail is declared
+once in ``RAILS``. Rails with the same filter and ordering share a single
+source that is fetched at the largest size any of them needs, and smaller
+rails are sliced from it.
+
+All sources are fetched together on a cache miss: one UNION ALL query for
+the product ids (each branch walks its own index and stops at its limit),
+then the products with their category and images. The result is cached
+until a product, image or category changes (see ``store.signals``), and
+the last good copy is served while a slow refresh runs (``store.degrade``).
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import prefetch_related_objects
+
+from . import degrade
+from .models import Product
+
+Rail = namedtuple('Rail', ['filters', 'order_by', 'size'])
+
+RAILS = {
+    'slider': Rail({'is_slider': True}, ('-created_at',), None),
+    'latest': Rail({}, ('-created_at',), 5),
+    'trending': Rail({}, ('-created_at',), 5),
+    'new': Rail({}, ('-created_at',), 5),
+    'featured': Rail({'is_featured': True}, ('-created_at',), 5),
+    'promoted': Rail({'is_promoted': True}, ('-created_at',), 5),
+    'mobile': Rail({'category__name': 'Mobile'}, ('-created_at',), 5),
+    'home_featured': Rail({'is_featured': True}, ('-created_at',), 8),
+    'home_new_arrivals': Rail({}, ('-created_at',), 8),
+}
+
+CACHE_KEY = 'store:rails'
+
+
+def _source_key(rail):
+    return (tuple(sorted(rail.filters.items())), rail.order_by)
+
+
+def _sources():
+    """Map each distinct (filters, order_by) to the largest size needed."""
+    sources = {}
+    for rail in RAILS.values():
+        key = _source_key(rail)
+        if key not in sources:
+            sources[key] = rail.size
+        elif sources[key] is not None:
+            sources[key] = None if rail.size is None else max(sources[key], rail.size)
+    return sources
+
+
+def _sort(products, order_by):
+    for field in reversed(order_by):
+        name = field.lstrip('-')
+        products.sort(key=lambda product: getattr(product, name), reverse=field.startswith('-'))
+    return products
+
+
+def _fetch(sources):
+    branches, params = [], []
+    for index, ((filters, order_by), size) in enumerate(sources.items()):
+        queryset = Product.objects.filter(is_active=True, **dict(filters)).order_by(*order_by)
+        queryset = queryset.values_list('pk', flat=True)
+        if size is not None:
+            queryset = queryset[:size]
+        sql, branch_params = queryset.query.sql_with_params()
+        branches.append(f'SELECT {index} AS source, source_{index}.* FROM ({sql}) source_{index}')
+        params.extend(branch_params)
+
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(branches), params)
+        rows = cursor.fetchall()
+
+    to_python = Product._meta.pk.to_python
+    ids = [(source, to_python(pk)) for source, pk in rows]
+
+    products = Product.objects.select_related('category').in_bulk({pk for _, pk in ids})
+    prefetch_related_objects(list(products.values()), 'images')
+
+    results = {key: [] for key in sources}
+    keys = list(sources)
+    for source, pk in ids:
+        if pk in products:
+            results[keys[source]].append(products[pk])
+    return {key: _sort(items, key[1]) for key, items in results.items()}
+
+
+def _expand(results):
+    rails = {}
+    for name, rail in RAILS.items():
+        products = results.get(_source_key(rail), [])
+        rails[name] = products if rail.size is None else products[:rail.size]
+    return rails
+
+
+def get_rails():
+    """Return every registered rail as a dict of name to product list."""
+    results = degrade.read(CACHE_KEY, lambda: _fetch(_sources()), settings.RAILS_CACHE_TIMEOUT)
+    return _expand(results)
+
+
+def cached_rails():
+    """Like ``get_rails()``, but None instead of querying on a cache miss."""
+    results = cache.get(CACHE_KEY)
+    return None if results is None else _expand(results)
+
+
+def get_rail(name):
+    return get_rails()[name]
+
+
+def invalidate_rails():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import categories, generations, page_cache, rails
+from .models import Category, Product, ProductDescription, ProductImage, Review, SubCategory
+
+
+def refresh_rails():
+    """
+    Drop the cached rails and purge the pages of every rail whose
+    membership changed. Product content changes are covered by the
+    product tags of the pages showing them.
+    """
+    before = rails.cached_rails()
+    rails.invalidate_rails()
+    if before is None:
+        page_cache.purge(*(f'rail:{name}' for name in rails.RAILS))
+        return
+
+    after = rails.get_rails()
+    page_cache.purge(*(
+        f'rail:{name}' for name in rails.RAILS
+        if [p.pk for p in before[name]] != [p.pk for p in after[name]]
+    ))
+
+
+# Saves touching only these (an order taking stock) change nothing shown
+# outside the product's own page
+PAGE_ONLY_FIELDS = {'stock', 'updated_at'}
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= PAGE_ONLY_FIELDS:
+        page_cache.purge(page_cache.product_tag(instance))
+        return
+    generations.bump(generations.CATALOG)
+    refresh_rails()
+    page_cache.purge(
+        page_cache.product_tag(instance),
+        page_cache.category_tag(instance.category_id),
+        f'subcategory:{instance.subcategory_id}',
+    )
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    # Cached product cards are keyed on the product's updated_at
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    generations.bump(generations.CATALOG)
+    rails.invalidate_rails()
+    page_cache.purge(page_cache.product_tag(instance.product_id))
+
+
+@receiver([post_save, post_delete], sender=ProductDescription)
+def product_description_changed(sender, instance, **kwargs):
+    generations.bump(generations.CATALOG)
+    page_cache.purge(page_cache.product_tag(instance.product_id))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    generations.bump(generations.CATALOG)
+    categories.invalidate_category_tree()
+    refresh_rails()
+    page_cache.purge(page_cache.category_tag(instance), 'categories')
+
+
+@receiver([post_save, post_delete], sender=SubCategory)
+def subcategory_changed(sender, instance, **kwargs):
+    generations.bump(generations.CATALOG)
+    categories.invalidate_category_tree()
+    page_cache.purge(f'subcategory:{instance.pk}', 'categories')
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    generations.bump(generations.CATALOG)
+    page_cache.purge(page_cache.product_tag(instance.product_id))
+
+
+@generations.on_change(generations.CATALOG)
+def catalog_changed_elsewhere():
+    """
+    Another process changed the catalog. With a shared cache backend its
+    invalidations already reached this one; a process-local cache has to
+    drop its rails, categories and pages itself.
+    """
+    if generations.cache_is_local():
+        rails.invalidate_rails()
+        categories.invalidate_category_tree()
+        page_cache.purge(page_cache.CATALOG_TAG)
@@ -0,0 +1,38 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from store.images import FORMATS, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, sizes='100vw', dimensions=False, placeholder=False, **attrs):
+    """
+    Render a ``ProductImage`` or ``ProductDescription`` image as a
+    ``<picture>`` with WebP and JPEG ``srcset``s of its derivatives, or as
+    the original alone while those are not ready. With ``dimensions`` the
+    stored size becomes the ``width``/``height`` attributes, so the space is
+    reserved before the image arrives; the stylesheet must then scale the
+    image with ``height: auto``. With ``placeholder`` the stored blurred
+    copy is the ``<img>`` background until the image covers it; it needs
+    the reserved space, so use it together with ``dimensions``.
+    Extra keyword arguments become ``<img>`` attributes.
+    Usage: {% picture product_image sizes="(max-width: 767px) 50vw, 200px" dimensions=True loading="lazy" alt=product.name %}
+    """
+    if not image or not image.image:
+        return ''
+    if dimensions and image.width and image.height:
+        attrs = {'width': image.width, 'height': image.height, **attrs}
+    if placeholder and image.placeholder:
+        style = f'background: url({image.placeholder}) center / cover no-repeat'
+        attrs['style'] = f"{attrs['style'].rstrip('; ')}; {style}" if attrs.get('style') else style
+    img = format_html('<img{} />', flatatt({'src': image.image.url, **attrs}))
+    if not srcset(image, 'webp'):
+        return img
+
+    sources = format_html_join('', '<source type="{}" srcset="{}" sizes="{}" />', (
+        (mime, srcset(image, extension), sizes) for extension, (_, mime, _) in FORMATS.items()
+    ))
+    return format_html('<picture>{}{}</picture>', sources, img)
@@ -1,3 +1,385 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import F
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from accounts.models import Account
+from ecommerce.release import release_id
+
+from . import generations, images, page_cache
+from .admin import ReviewAdmin
+from .models import Category, Generation, Product, ProductImage, Review
+
+
+class ApproveReviewsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Phones')
+        self.product = Product.objects.create(name='Phone', category=category, price='100.00', stock=5)
+        user = Account.objects.create_user('reviewer', 'reviewer@example.com', 'password')
+        self.review = Review.objects.create(product=self.product, user=user, rating=5, title='Good', comment='Good')
+
+    def test_purges_the_product_pages(self):
+        tag = page_cache.product_tag(self.product)
+        version = page_cache._tag_versions([tag])[tag]
+        generation = generations.value(generations.CATALOG)
+        updated_at = self.review.updated_at
+
+        ReviewAdmin(Review, admin.site).approve_reviews(None, Review.objects.all())
+
+        self.review.refresh_from_db()
+        self.assertTrue(self.review.is_approved)
+        self.assertGreater(self.review.updated_at, updated_at)
+        self.assertNotEqual(page_cache._tag_versions([tag])[tag], version)
+        self.assertGreater(generations.value(generations.CATALOG), generation)
+
+
+@override_settings(GENERATION_CHECK_INTERVAL=60)
+class GenerationTests(TestCase):
+    name = 'test-generation'
+
+    def setUp(self):
+        self.calls = []
+        # The table is rolled back after each test, the process's record of it is not
+        generations._seen.pop(self.name, None)
+        generations.on_change(self.name)(lambda: self.calls.append(self.name))
+        self.addCleanup(generations._handlers.pop, self.name)
+        generations.bump(self.name)
+        generations.sync(force=True)
+
+    def bump_elsewhere(self):
+        # What another process's bump() leaves in the table
+        Generation.objects.filter(name=self.name).update(value=F('value') + 1)
+
+    def test_bump_elsewhere_runs_the_handlers(self):
+        value = generations.value(self.name)
+        self.bump_elsewhere()
+
+        generations.sync(force=True)
+
+        self.assertEqual(self.calls, [self.name])
+        self.assertEqual(generations.value(self.name), value + 1)
+
+    def test_own_bump_does_not_run_the_handlers(self):
+        value = generations.value(self.name)
+
+        generations.bump(self.name)
+        generations.sync(force=True)
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(generations.value(self.name), value + 1)
+
+    def test_own_and_other_bump_run_the_handlers(self):
+        self.bump_elsewhere()
+
+        generations.bump(self.name)
+
+        self.assertEqual(self.calls, [self.name])
+
+    def test_sync_waits_for_the_check_interval(self):
+        self.bump_elsewhere()
+
+        generations.sync()
+        self.assertEqual(self.calls, [])
+
+        with override_settings(GENERATION_CHECK_INTERVAL=0):
+            generations.sync()
+        self.assertEqual(self.calls, [self.name])
+
+    @override_settings(GENERATION_CHECK_INTERVAL=0)
+    def test_middleware_syncs_before_the_view(self):
+        self.bump_elsewhere()
+        middleware = generations.GenerationMiddleware(lambda request: HttpResponse(','.join(self.calls)))
+
+        response = middleware(RequestFactory().get('/'))
+
+        self.assertEqual(response.content.decode(), self.name)
+
+
+class ProductChangedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Phones')
+        self.product = Product.objects.create(name='Phone', category=category, price='100.00', stock=5)
+        self.tag = page_cache.product_tag(self.product)
+
+    def test_stock_change_purges_only_the_product(self):
+        version = page_cache._tag_versions([self.tag, page_cache.CATALOG_TAG])
+        generation = generations.value(generations.CATALOG)
+
+        self.product.stock -= 1
+        self.product.save(update_fields=['stock', 'updated_at'])
+
+        self.assertEqual(generations.value(generations.CATALOG), generation)
+        after = page_cache._tag_versions([self.tag, page_cache.CATALOG_TAG])
+        self.assertNotEqual(after[self.tag], version[self.tag])
+        self.assertEqual(after[page_cache.CATALOG_TAG], version[page_cache.CATALOG_TAG])
+
+    def test_other_changes_bump_the_catalog(self):
+        generation = generations.value(generations.CATALOG)
+
+        self.product.price = '90.00'
+        self.product.save()
+
+        self.assertGreater(generations.value(generations.CATALOG), generation)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        release_id.cache_clear()
+        self.addCleanup(release_id.cache_clear)
+        category = Category.objects.create(name='Phones')
+        self.phone = Product.objects.create(name='Phone', category=category, price='100.00', stock=5)
+        self.case = Product.objects.create(name='Case', category=category, price='10.00', stock=5)
+
+    def etag(self, product):
+        response = self.client.get(product.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_revalidation_is_not_modified(self):
+        etag = self.etag(self.phone)
+
+        response = self.client.get(self.phone.get_absolute_url(), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_page_has_its_own_etag(self):
+        etag = self.etag(self.phone)
+
+        response = self.client.get(self.case.get_absolute_url(), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_release_is_sent_in_full(self):
+        with override_settings(RELEASE_ID='1'):
+            etag = self.etag(self.phone)
+        release_id.cache_clear()
+
+        with override_settings(RELEASE_ID='2'):
+            response = self.client.get(self.phone.get_absolute_url(), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_change_is_sent_in_full(self):
+        etag = self.etag(self.phone)
+        self.phone.price = '90.00'
+        self.phone.save()
+
+        response = self.client.get(self.phone.get_absolute_url(), headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+
+
+class StalePageTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_database_error_serves_the_last_good_copy(self):
+        calls = []
+
+        @page_cache.cache_page_for_anonymous
+        def view(request):
+            calls.append(threading.get_ident())
+            if len(calls) > 1:
+                raise DatabaseError('locked')
+            return HttpResponse('first')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request)['X-Page-Cache'], 'miss')
+        page_cache.purge(page_cache.CATALOG_TAG)
+
+        with self.assertLogs('store.degrade', 'ERROR'):
+            response = view(request)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertEqual(response.content, b'first')
+        # The view ran on the request's thread
+        self.assertEqual(calls, [threading.get_ident()] * 2)
+
+
+class QueryPlanTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        # Raises CommandError when one of them falls back to a full scan
+        call_command('check_query_plans', stdout=StringIO())
+
+    def test_partial_indexes_are_picked(self):
+        active = Product.objects.filter(is_active=True)
+        self.assertIn('products_featured_recent_idx', active.filter(is_featured=True).order_by('-created_at')[:5].explain())
+        self.assertIn('products_slider_recent_idx', active.filter(is_slider=True).order_by('-created_at').explain())
+
+
+class CollectMediaGarbageTests(TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(MEDIA_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        category = Category.objects.create(name='Phones')
+        product = Product.objects.create(name='Phone', category=category, price='100.00')
+        # bulk_create skips the upload processing
+        ProductImage.objects.bulk_create([ProductImage(product=product, image='products/gallery/ab/ab12.jpg')])
+
+    def write(self, name, age_hours=48):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'image')
+        mtime = path.stat().st_mtime - age_hours * 3600
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def collect(self, *args):
+        call_command('collect_media_garbage', *args, stdout=StringIO())
+
+    def test_deletes_only_old_unreferenced_files(self):
+        kept = [
+            self.write('products/gallery/ab/ab12.jpg'),
+            self.write('products/gallery/ab/ab12.320w.webp'),  # Derivative of a referenced image
+            self.write('products/gallery/cd/cd34.jpg', age_hours=1),  # Inside the grace period
+        ]
+        orphans = [
+            self.write('products/gallery/ef/ef56.jpg'),
+            self.write('products/gallery/ef/ef56.320w.webp'),
+        ]
+
+        self.collect('--delete')
+
+        self.assertTrue(all(path.exists() for path in kept))
+        self.assertFalse(any(path.exists() for path in orphans))
+
+    def test_reports_without_delete(self):
+        orphan = self.write('products/gallery/ef/ef56.jpg')
+
+        self.collect()
+
+        self.assertTrue(orphan.exists())
+
+
+def jpeg(size=(400, 200), **save_options):
+    buffer = BytesIO()
+    Image.new('RGB', size, (30, 90, 200)).save(buffer, 'JPEG', **save_options)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_PROCESSING_WORKERS=0, IMAGE_DERIVATIVE_WIDTHS=(160, 320, 640))
+class ImageProcessingTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(MEDIA_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        category = Category.objects.create(name='Phones')
+        self.product = Product.objects.create(name='Phone', category=category, price='100.00')
+
+    def upload(self, content):
+        with self.captureOnCommitCallbacks() as callbacks:
+            image = ProductImage.objects.create(product=self.product, image=SimpleUploadedFile('photo.jpg', content))
+        image.refresh_from_db()
+        self.assertEqual(image.processing_status, images.PENDING)
+        self.assertEqual(image.derivative_widths, [])
+        # Processed inline once the upload is committed
+        for callback in callbacks:
+            callback()
+        image.refresh_from_db()
+        return image
+
+    def render(self, image):
+        template = Template('{% load responsive %}'
+                            '{% picture image sizes="50vw" dimensions=True placeholder=True alt="Phone" %}')
+        return template.render(Context({'image': image}))
+
+    def test_upload_is_processed(self):
+        image = self.upload(jpeg((400, 200)))
+
+        self.assertEqual(image.processing_status, images.READY)
+        # 640 is wider than the original, which is re-encoded at its own width instead
+        self.assertEqual(image.derivative_widths, [160, 320, 400])
+        self.assertEqual((image.width, image.height), (400, 200))
+        self.assertTrue(image.placeholder.startswith('data:image/webp;base64,'))
+        for width in image.derivative_widths:
+            for extension, (format, _, _) in images.FORMATS.items():
+                with default_storage.open(images.derivative_name(image.image.name, width, extension)) as f:
+                    derivative = Image.open(f)
+                    self.assertEqual((derivative.format, derivative.size), (format, (width, width // 2)))
+
+    def test_rotated_upload_has_its_displayed_size(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90°
+
+        image = self.upload(jpeg((400, 200), exif=exif.tobytes()))
+
+        self.assertEqual((image.width, image.height), (200, 400))
+        self.assertEqual(image.derivative_widths, [160, 200])
+
+    def test_broken_upload_fails(self):
+        with self.assertLogs('store.images', 'ERROR'):
+            image = self.upload(b'not an image')
+
+        self.assertEqual(image.processing_status, images.FAILED)
+        self.assertEqual(image.derivative_widths, [])
+        self.assertHTMLEqual(self.render(image), f'<img src="{image.image.url}" alt="Phone" />')
+
+    def test_picture_markup(self):
+        image = self.upload(jpeg((400, 200)))
+        url = image.image.storage.url
+
+        html = self.render(image)
+
+        for extension, (_, mime, _) in images.FORMATS.items():
+            srcset = ', '.join(f'{url(images.derivative_name(image.image.name, width, extension))} {width}w'
+                               for width in (160, 320, 400))
+            self.assertInHTML(f'<source type="{mime}" srcset="{srcset}" sizes="50vw" />', html)
+        self.assertInHTML(
+            f'<img src="{image.image.url}" width="400" height="200" alt="Phone"'
+            f' style="background: url({image.placeholder}) center / cover no-repeat" />', html)
+        self.assertTrue(html.startswith('<picture>'))
+
+    def test_pending_image_renders_the_original(self):
+        with self.captureOnCommitCallbacks():
+            image = ProductImage.objects.create(product=self.product, image=SimpleUploadedFile('photo.jpg', jpeg()))
+
+        self.assertHTMLEqual(self.render(image), f'<img src="{image.image.url}" alt="Phone" />')
+
+    def test_backfill_dimensions(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90°
+        name = default_storage.save('products/gallery/photo.jpg', ContentFile(jpeg((400, 200), exif=exif.tobytes())))
+        # bulk_create skips the upload processing
+        ProductImage.objects.bulk_create([
+            ProductImage(product=self.product, image=name),
+            ProductImage(product=self.product, image='products/gallery/missing.jpg'),
+        ])
+
+        call_command('backfill_image_dimensions', stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(
+            set(ProductImage.objects.values_list('image', 'width', 'height')),
+            {(name, 200, 400), ('products/gallery/missing.jpg', None, None)},
+        )
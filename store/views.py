@@ -3,23 +3,58 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg
+from ecommerce.preload import preload
+from .images import derivative_name, srcset
 from .models import Product, Category, Review, SubCategory
+from .rails import get_rails
+from . import page_cache
+from .page_cache import cache_page_for_anonymous
+from .conditional import home_condition, listing_condition, product_condition, category_condition
 
+# ``sizes`` of the preloaded images, as in their {% picture %} tags
+SLIDER_IMAGE_SIZES = '(max-width: 767px) 100vw, 50vw'  # index.html
+MAIN_IMAGE_SIZES = '(max-width: 767px) 100vw, 50vw'  # store/product_detail.html
 
+
+def preload_picture(response, image, sizes):
+    """
+    Preload ``image`` as its ``{% picture %}`` tag shows it: the WebP
+    derivative the browser picks for ``sizes`` (browsers without WebP skip
+    the link), or the original while there are no derivatives.
+    """
+    if image is None:
+        return response
+    webp = srcset(image, 'webp')
+    if not webp:
+        return preload(response, image.image.url)
+    largest = image.image.storage.url(derivative_name(image.image.name, max(image.derivative_widths), 'webp'))
+    return preload(response, largest, imagesrcset=webp, imagesizes=sizes, type='image/webp')
+
+
+@home_condition
+@cache_page_for_anonymous
 def home_view(request):
     """Homepage view"""
-    featured_products = Product.objects.filter(is_active=True, is_featured=True)[:8]
-    new_arrivals = Product.objects.filter(is_active=True).order_by('-created_at')[:8]
+    rails = get_rails()
+    featured_products = rails['home_featured']
+    new_arrivals = rails['home_new_arrivals']
     categories = Category.objects.filter(is_active=True)[:6]
+    page_cache.tag(request, 'categories', 'rail:home_featured', 'rail:home_new_arrivals')
+    page_cache.tag_products(request, featured_products + new_arrivals)
     
     context = {
         'featured_products': featured_products,
         'new_arrivals': new_arrivals,
         'categories': categories,
     }
-    return render(request, 'index.html', context)
+    response = render(request, 'index.html', context)
+    slider = rails['slider']
+    first_slide = slider[0].images.all() if slider else []
+    return preload_picture(response, first_slide[0] if first_slide else None, SLIDER_IMAGE_SIZES)
 
 
+@listing_condition
+@cache_page_for_anonymous
 def product_list_view(request):
     """Product listing with filters"""
     products = Product.objects.filter(is_active=True)
@@ -48,6 +83,8 @@ def product_list_view(request):
     paginator = Paginator(products, 12)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
+    page_cache.tag(request, 'categories', *(page_cache.category_tag(c) for c in categories))
+    page_cache.tag_products(request, page_obj)
     
     context = {
         'page_obj': page_obj,
@@ -57,6 +94,8 @@ def product_list_view(request):
     return render(request, 'store/product.html', context)
 
 
+@product_condition
+@cache_page_for_anonymous
 def product_detail_view(request, slug):
     """Product detail view"""
     product = get_object_or_404(Product, slug=slug, is_active=True)
@@ -71,6 +110,7 @@ def product_detail_view(request, slug):
     for idx, desc in enumerate(descriptions):
         description_sections.append({
             'image': desc.image.url if desc.image else '',
+            'picture': desc,
             'title': desc.title,
             'content': desc.content,
             'is_right': idx % 2 == 1,  # alternate left/right
@@ -81,6 +121,8 @@ def product_detail_view(request, slug):
         category=product.category,
         is_active=True
     ).exclude(id=product.id)[:6]
+    page_cache.tag(request, page_cache.category_tag(product.category_id), f'subcategory:{product.subcategory_id}')
+    page_cache.tag_products(request, [product, *related_products])
     
     # Check if user has already reviewed this product
     user_has_reviewed = False
@@ -120,9 +162,12 @@ def product_detail_view(request, slug):
         'grouped_info': grouped_info,
         'variant_names': variant_names,
     }
-    return render(request, 'store/product_detail.html', context)
+    response = render(request, 'store/product_detail.html', context)
+    return preload_picture(response, product_images[0] if product_images else None, MAIN_IMAGE_SIZES)
 
 
+@category_condition
+@cache_page_for_anonymous
 def category_view(request, slug):
     """Category page view"""
     category = None
@@ -165,6 +210,12 @@ def category_view(request, slug):
     
     # Get all categories for sidebar
     categories = Category.objects.filter(is_active=True)
+    if category:
+        page_cache.tag(request, page_cache.category_tag(category))
+    else:
+        page_cache.tag(request, f'subcategory:{subcategory.pk}')
+    page_cache.tag(request, 'categories', *(page_cache.category_tag(c) for c in categories))
+    page_cache.tag_products(request, page_obj)
     
     context = {
         'category': category,